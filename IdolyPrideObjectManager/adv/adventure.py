@@ -15,6 +15,8 @@ parser = PradvCommandParser()
 class PrideAdventure(PrideDummyMedia):
     """Handler for adventure story scripts."""
 
+    ENABLE_OFFLOAD = False  # needs self.raw, and is cheap anyway
+
     _commands: list[dict] = []
 
     def _init_mimetype(self):
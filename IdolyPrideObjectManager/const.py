@@ -3,6 +3,7 @@ const.py
 Module-wide constants (macro equivalents).
 """
 
+import os
 from pathlib import Path
 from typing import Union
 from urllib.parse import urljoin
@@ -43,8 +44,40 @@ CSV_COLUMNS = [
     "state",
 ]
 
+# manifest snapshot cache
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"),
+    "IdolyPrideObjectManager",
+)
+SNAPSHOT_MAGIC = b"IPOMSNAP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_KEEP = 16  # most recently used snapshots retained on disk
+SNAPSHOT_MAX_AGE = 60 * 60  # seconds before a cached 'latest' is refetched
+
+# manifest refresh (see manifest/refresher.py)
+MANIFEST_REFRESH_INTERVAL = 10 * 60  # seconds between diff fetches in the server
+
+# manifest search pagination (see PrideManifest.search_page)
+SEARCH_PAGE_SIZE = 12  # default entries per page of search_page()
+SEARCH_MAX_PAGE_SIZE = 96  # entries per page the server returns at most
+
+# HTTP connection pool (see network.py)
+HTTP_POOL_HOSTS = 4  # manifest API and CDN, with room to spare
+HTTP_POOL_PER_HOST = 16  # keep-alive connections, at least the download concurrency
+HTTP_POOL_BLOCK = False  # True to make HTTP_POOL_PER_HOST a hard limit
+
 # manifest download dispatcher
 DEFAULT_DOWNLOAD_PATH = "objects/"
+DOWNLOAD_WORKERS = 16  # export (deobfuscate, convert, write) stage threads
+DOWNLOAD_NET_WORKERS = HTTP_POOL_PER_HOST  # fetch stage threads, concurrent transfers
+DOWNLOAD_CPU_WORKERS = os.cpu_count() or 1  # concurrent media conversions
+DOWNLOAD_PROCESSES = 0  # conversion worker processes, 0 to convert in threads
+DOWNLOAD_ORDER = ""  # admission order, see manifest/scheduler.py
+DOWNLOAD_MAX_INFLIGHT = 1 << 30  # bytes of objects being processed at once
+DOWNLOAD_QUEUE_SIZE = 32  # objects waiting in front of each stage
+SYNC_INDEX_NAME = (
+    ".ipom-sync.json"  # sidecar in the download root, see manifest/sync.py
+)
 
 # object download
 CHARACTER_ABBREVS = [
@@ -84,9 +117,25 @@ CHARACTER_ABBREVS = [
     "chn",  # kafu CHiNo
 ]
 
+# object download resumption (see PrideResource._download_part)
+RESUME_CHECKPOINT = 4 << 20  # bytes between journal updates
+STREAM_CHUNK = 1 << 20  # bytes per chunk when streaming stored objects
+
+# object store (see object/store.py)
+DEFAULT_STORE_PATH = DEFAULT_CACHE_PATH / "objects"
+STORE_LINK_MODES = ("reflink", "hardlink", "copy")  # tried in order
+
+# media payload cache (see media/cache.py)
+MEDIA_CACHE_BUDGET = 512 << 20  # bytes of raw and converted payloads kept in memory
+DEFAULT_CONVERSION_CACHE_PATH = DEFAULT_CACHE_PATH / "converted"
+CONVERSION_CACHE_BUDGET = (
+    4 << 30
+)  # bytes of converted payloads kept on disk, 0 to disable
+
 # object deobfuscate
 PRIDE_UNITY_VERSION = "2022.3.21f1"
 UNITY_SIGNATURE = b"UnityFS"
+DEOBFUSCATE_MASK_CACHE = 4096  # bundle names whose masks are kept
 
 # adventure captioning
 DEFAULT_USERNAME = "マネージャー"
@@ -6,6 +6,7 @@ Entry point of the IdolyPrideObjectManager package.
 
 import json
 from pathlib import Path
+from typing import Optional
 from urllib.parse import urljoin
 
 import requests
@@ -20,12 +21,21 @@ from ..const import (
     PRIDE_ONLINEPDB_KEY,
     PathArgtype,
 )
+from ..network import pool
 from .decrypt import AESCBCDecryptor
 from .manifest import PrideManifest
-from .octodb_pb2 import pdbytes2dict
+from .octodb_pb2 import pdbytes2columns
+from .snapshot import PrideSnapshotCache, source_key
 
+snapshots = PrideSnapshotCache()
 
-def fetch(base_revision: int = 0) -> PrideManifest:
+
+def fetch(
+    base_revision: int = 0,
+    session: Optional[requests.Session] = None,
+    cache: bool = True,
+    max_age: float = 0,
+) -> PrideManifest:
     """
     Requests an online manifest by the specified revision.
     Algorithm courtesy of github.com/DreamGallery/HatsuboshiToolkit
@@ -34,16 +44,51 @@ def fetch(base_revision: int = 0) -> PrideManifest:
         base_revision (int): The "base" revision number of the manifest.
             This API return the *difference* between the specified base
             revision and the latest. Defaults to 0 (standalone latest).
+        session (requests.Session, optional): Session to send the request with.
+            Defaults to the shared connection pool (see network.py).
+        cache (bool) = True: Whether to open/save the parsed manifest
+            from/to the local snapshot cache (see snapshot.py).
+            Still requests the server, but skips parsing if the revision is cached.
+        max_age (float) = 0: If positive, skips the request altogether when the
+            same 'base_revision' was fetched no longer than 'max_age' seconds ago.
+    """
+
+    if cache and max_age > 0:
+        manifest = snapshots.get_latest(base_revision, max_age)
+        if manifest is not None:
+            return manifest
+
+    pdb = _request_pdb(base_revision, session)
+
+    if not cache:
+        return PrideManifest(pdbytes2columns(pdb), base_revision=base_revision)
+
+    key = source_key(pdb, base_revision)
+    manifest = snapshots.get(key)
+    if manifest is None:
+        manifest = PrideManifest(pdbytes2columns(pdb), base_revision=base_revision)
+        snapshots.put(key, manifest)
+    snapshots.set_latest(base_revision, key)
+    return manifest
+
+
+def _request_pdb(
+    base_revision: int = 0, session: Optional[requests.Session] = None
+) -> bytes:
     """
+    [INTERNAL] Requests the decrypted protobuf database by the specified revision,
+    see fetch() for the arguments.
+    """
+
     url = urljoin(PRIDE_API_URL, str(base_revision))
-    req = requests.get(url, headers=PRIDE_API_HEADER, timeout=10)
+    req = (session or pool).get(url, headers=PRIDE_API_HEADER, timeout=10)
     req.raise_for_status()  # Raise an error for bad responses
     enc = req.content
     dec = AESCBCDecryptor(PRIDE_ONLINEPDB_KEY, PRIDE_ONLINEPDB_IV).process(enc)
-    return PrideManifest(pdbytes2dict(dec[16:]), base_revision=base_revision)
+    return dec[16:]
 
 
-def load(src: PathArgtype, base_revision: int = 0) -> PrideManifest:
+def load(src: PathArgtype, base_revision: int = 0, cache: bool = True) -> PrideManifest:
     """
     Initializes a manifest from the given offline source.
     The protobuf referred to can be either encrypted or not.
@@ -58,16 +103,33 @@ def load(src: PathArgtype, base_revision: int = 0) -> PrideManifest:
         base_revision (int) = 0: The revision number of the base manifest.
             **Must be manually specified if loading a diff generated
             by IdolyPrideObjectManager older than or equal to v0.4-beta.**
+        cache (bool) = True: Whether to open/save the parsed manifest
+            from/to the local snapshot cache, keyed by the file content.
+    """
+
+    src = Path(src).read_bytes()
+    if not cache:
+        return _parse(src, base_revision)
+
+    key = source_key(src, base_revision)
+    manifest = snapshots.get(key)
+    if manifest is None:
+        manifest = _parse(src, base_revision)
+        snapshots.put(key, manifest)
+    return manifest
+
+
+def _parse(src: bytes, base_revision: int) -> PrideManifest:
+    """
+    [INTERNAL] Parses the content of a manifest file, see load().
     """
     try:
-        return PrideManifest(
-            json.loads(Path(src).read_text(encoding="utf-8")),
-            base_revision,
-        )
-    except json.JSONDecodeError:
-        enc = Path(src).read_bytes()
+        return PrideManifest(json.loads(src.decode("utf-8")), base_revision)
+    except ValueError:  # JSONDecodeError, or UnicodeDecodeError on binary input
         try:
-            return PrideManifest(pdbytes2dict(enc), base_revision)
+            return PrideManifest(pdbytes2columns(src), base_revision)
         except DecodeError:
-            dec = AESCBCDecryptor(PRIDE_OCTOCACHE_KEY, PRIDE_OCTOCACHE_IV).process(enc)
-            return PrideManifest(pdbytes2dict(dec[16:]), base_revision)  # trim md5 hash
+            dec = AESCBCDecryptor(PRIDE_OCTOCACHE_KEY, PRIDE_OCTOCACHE_IV).process(src)
+            return PrideManifest(
+                pdbytes2columns(dec[16:]), base_revision
+            )  # trim md5 hash
@@ -0,0 +1,411 @@
+"""
+columns.py
+[INTERNAL] Columnar, array-backed storage for PrideObjectList.
+"""
+
+import sys
+from bisect import bisect_left
+from collections.abc import Sequence
+from hashlib import blake2b
+from itertools import chain
+from operator import attrgetter
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Fields of the 'Data' message, in protobuf (and therefore canon) order.
+# Each field is stored in one of four kinds of columns:
+# - 'int': a NumPy array of the given dtype,
+# - 'str': a list of interned strings (or a PrideStringColumn from a snapshot),
+# - 'enum': a uint8 NumPy array of indices into STATE_NAMES,
+# - 'list': a flattened int32 NumPy array with int64 offsets (CSR layout).
+FIELDS = [
+    ("id", "int", np.int32),
+    ("filepath", "str", None),
+    ("name", "str", None),
+    ("size", "int", np.int64),
+    ("crc", "int", np.uint32),
+    ("priority", "int", np.int32),
+    ("tagid", "list", np.int32),
+    ("dependencies", "list", np.int32),
+    ("state", "enum", np.uint8),
+    ("md5", "str", None),
+    ("objectName", "str", None),
+    ("generation", "int", np.uint64),
+    ("uploadVersionId", "int", np.int32),
+]
+FIELD_NAMES = [field for field, _, _ in FIELDS]
+STATE_NAMES = ["NONE", "ADD", "UPDATE", "LATEST", "DELETE"]
+
+
+class PrideStringColumn(Sequence):
+    """
+    Read-only sequence of strings backed by a UTF-8 blob and int64 offsets,
+    decoded on access. Used for memory-mapped snapshots (see snapshot.py).
+
+    Attributes:
+        blob (np.ndarray): Concatenated UTF-8 bytes of all strings (uint8).
+        offsets (np.ndarray): Start offset of each string, plus the total length.
+    """
+
+    blob: np.ndarray
+    offsets: np.ndarray
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "PrideStringColumn":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        start, end = self.offsets.item(idx), self.offsets.item(idx + 1)
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        blob, offsets = self.blob.tobytes(), self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield blob[start:end].decode("utf-8")
+
+
+class PrideObjectColumns:
+    """
+    Column store of assetbundle/resource metadata, sorted by ID.
+    Replaces the list of info dictionaries once held by PrideObjectList;
+    info dictionaries are only materialized on access.
+
+    Attributes:
+        mask (np.ndarray): Per-row bitmask of the fields present in the source,
+            since MessageToDict() omits default-valued fields.
+            Bit i corresponds to FIELDS[i].
+        columns (dict): Field name -> column, see FIELDS for layout.
+        offsets (dict): Field name -> CSR offsets, for 'list' columns only.
+        extras (dict): Row index -> dictionary of unrecognized fields, if any.
+        name_order (np.ndarray): Row indices sorted by name, for bisection.
+            Built lazily on first lookup by name.
+        fingerprints (np.ndarray): Per-row 16-byte digest of all fields,
+            for comparison across lists. Built lazily on first access.
+
+    Methods:
+        from_infos(infos: list[dict]) -> PrideObjectColumns:
+            Builds columns from a list of info dictionaries.
+        info(idx: int) -> dict:
+            Materializes the info dictionary of the specified row.
+        find_id(id: int) -> int:
+            Returns the row index of the specified ID, or raises KeyError.
+        find_name(name: str) -> int:
+            Returns the row index of the specified name, or raises KeyError.
+        take(indices: Iterable[int]) -> PrideObjectColumns:
+            Selects a subset of rows (in the given order, re-sorted by ID).
+        concat(other: PrideObjectColumns) -> PrideObjectColumns:
+            Concatenates two column stores (re-sorted by ID).
+    """
+
+    mask: np.ndarray
+    columns: dict
+    offsets: dict
+    extras: dict[int, dict]
+
+    _name_order: Optional[np.ndarray] = None
+    _fingerprints: Optional[np.ndarray] = None
+
+    def __init__(
+        self,
+        mask: np.ndarray,
+        columns: dict,
+        offsets: dict,
+        extras: Optional[dict[int, dict]] = None,
+    ):
+        """
+        [INTERNAL] Initializes from prebuilt columns, which must already be sorted by ID.
+        Use from_infos() to build from info dictionaries.
+        """
+
+        self.mask = mask
+        self.columns = columns
+        self.offsets = offsets
+        self.extras = extras or {}
+
+    def __len__(self) -> int:
+        return len(self.mask)
+
+    @classmethod
+    def from_infos(cls, infos: list[dict]) -> "PrideObjectColumns":
+        """
+        Builds columns from a list of info dictionaries, as extracted from protobuf.
+        Each field is gathered in one pass and then frozen into an array.
+        """
+
+        n = len(infos)
+        columns, offsets = {}, {}
+
+        # Rows almost always share a handful of key layouts,
+        # so presence masks are computed once per layout.
+        bits = {field: 1 << bit for bit, field in enumerate(FIELD_NAMES)}
+        layouts = {}
+        for info in infos:
+            layout = tuple(info)
+            if layout not in layouts:
+                layouts[layout] = sum(bits.get(key, 0) for key in layout)
+        mask = np.array([layouts[tuple(info)] for info in infos], dtype=np.uint16)
+
+        for field, kind, dtype in FIELDS:
+            if kind == "str":
+                intern = sys.intern
+                columns[field] = [intern(info.get(field, "")) for info in infos]
+            elif kind == "enum":
+                codes = {name: code for code, name in enumerate(STATE_NAMES)}
+                columns[field] = np.array(
+                    [
+                        codes.get(info.get(field, 0), info.get(field, 0))
+                        for info in infos
+                    ],
+                    dtype=dtype,
+                )
+            elif kind == "list":
+                values = [info.get(field, ()) for info in infos]
+                lengths = np.fromiter(map(len, values), dtype=np.int64, count=n)
+                offsets[field] = np.concatenate(([0], np.cumsum(lengths)))
+                columns[field] = np.fromiter(
+                    (x for v in values for x in v),
+                    dtype=dtype,
+                    count=int(offsets[field][-1]),
+                )
+            else:  # 'generation' is stringified by MessageToDict
+                columns[field] = np.array(
+                    [int(info.get(field, 0)) for info in infos], dtype=dtype
+                )
+
+        extras = {}
+        if any(len(layout) != bin(m).count("1") for layout, m in layouts.items()):
+            extras = {
+                i: {key: value for key, value in info.items() if key not in bits}
+                for i, info in enumerate(infos)
+                if not info.keys() <= bits.keys()
+            }
+
+        return cls(mask, columns, offsets, extras)._sorted()
+
+    @classmethod
+    def from_messages(cls, messages: Sequence) -> "PrideObjectColumns":
+        """
+        Builds columns straight from parsed protobuf 'Data' messages,
+        bypassing MessageToDict. Presence follows MessageToDict,
+        which omits fields of default value (0, "", or empty).
+        """
+
+        n = len(messages)
+        mask = np.zeros(n, dtype=np.uint16)
+        columns, offsets = {}, {}
+
+        for bit, (field, kind, dtype) in enumerate(FIELDS):
+            values = list(map(attrgetter(field), messages))
+            if kind == "str":
+                columns[field] = list(map(sys.intern, values))
+                present = np.fromiter(map(bool, values), dtype=bool, count=n)
+            elif kind == "list":
+                lengths = np.fromiter(map(len, values), dtype=np.int64, count=n)
+                offsets[field] = np.concatenate(([0], np.cumsum(lengths)))
+                columns[field] = np.fromiter(
+                    chain.from_iterable(values),
+                    dtype=dtype,
+                    count=int(offsets[field][-1]),
+                )
+                present = lengths > 0
+            else:
+                columns[field] = np.array(values, dtype=dtype)
+                present = columns[field] != 0
+            mask |= present.astype(np.uint16) << bit
+
+        return cls(mask, columns, offsets)._sorted()
+
+    def _sorted(self) -> "PrideObjectColumns":
+        ids = self.ids
+        if len(ids) > 1 and not np.all(ids[:-1] <= ids[1:]):
+            return self.take(np.arange(len(ids)))  # take() sorts by ID
+        return self
+
+    # ----------- ACCESS ----------- #
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.columns["id"]
+
+    @property
+    def names(self) -> list[str]:
+        return self.columns["name"]
+
+    @property
+    def name_order(self) -> np.ndarray:
+        """Row indices sorted by name, built on first access."""
+        if self._name_order is None:
+            names = self.names
+            self._name_order = np.array(
+                sorted(range(len(names)), key=names.__getitem__), dtype=np.int64
+            )
+        return self._name_order
+
+    def value(self, field: str, idx: int):
+        """
+        Returns the JSON-compatible value of a single cell, regardless of its presence.
+        """
+
+        column = self.columns[field]
+        if field in self.offsets:
+            offsets = self.offsets[field]
+            return column[offsets.item(idx) : offsets.item(idx + 1)].tolist()
+        if field == "state":
+            return STATE_NAMES[column.item(idx)]
+        if field == "generation":
+            return str(column.item(idx))  # follows MessageToDict's uint64 convention
+        if not isinstance(column, np.ndarray):  # 'str' column
+            return column[idx]
+        return column.item(idx)
+
+    def info(self, idx: int) -> dict:
+        """
+        Materializes the info dictionary of the specified row,
+        with fields in the same order and presence as the source.
+        """
+
+        m = self.mask.item(idx)
+        info = {
+            field: self.value(field, idx)
+            for bit, field in enumerate(FIELD_NAMES)
+            if m >> bit & 1
+        }
+        if idx in self.extras:
+            info.update(self.extras[idx])
+        return info
+
+    def find_id(self, id: int) -> int:
+        ids = self.ids
+        idx = int(ids.searchsorted(id))
+        if idx == len(ids) or ids.item(idx) != id:
+            raise KeyError(id)
+        return idx
+
+    def find_name(self, name: str) -> int:
+        names = self.names
+        pos = bisect_left(self.name_order, name, key=names.__getitem__)
+        if pos == len(self.name_order) or names[self.name_order[pos]] != name:
+            raise KeyError(name)
+        return int(self.name_order[pos])
+
+    @property
+    def fingerprints(self) -> np.ndarray:
+        """
+        Fixed-width digests of every row, covering all fields and their presence,
+        such that equal fingerprints imply equal info dictionaries.
+        """
+
+        if self._fingerprints is None:
+            n = len(self)
+
+            # pack all fixed-width fields into one record per row
+            numeric = [(field, dtype) for field, kind, dtype in FIELDS if dtype]
+            numeric = [f for f in numeric if f[0] not in self.offsets]
+            records = np.empty(n, dtype=[("mask", np.uint16), *numeric])
+            records["mask"] = self.mask
+            for field, _ in numeric:
+                records[field] = self.columns[field]
+            records = records.tobytes()
+            width = len(records) // n if n else 0
+
+            strings = zip(*(self.columns[f] for f, kind, _ in FIELDS if kind == "str"))
+            lists = [
+                (self.columns[f].tobytes(), self.offsets[f] * self.columns[f].itemsize)
+                for f in self.offsets
+            ]
+
+            digests = bytearray()
+            for i, row in enumerate(strings):
+                h = blake2b(records[i * width : (i + 1) * width], digest_size=16)
+                h.update("\0".join(row).encode("utf-8"))
+                for buf, offsets in lists:  # length-prefixed
+                    h.update((offsets[i + 1] - offsets[i]).tobytes())
+                    h.update(buf[offsets[i] : offsets[i + 1]])
+                if i in self.extras:
+                    h.update(repr(sorted(self.extras[i].items())).encode("utf-8"))
+                digests += h.digest()
+
+            self._fingerprints = np.frombuffer(bytes(digests), dtype="S16")
+
+        return self._fingerprints
+
+    # --------- RESHAPING ---------- #
+
+    def take(self, indices: Iterable[int]) -> "PrideObjectColumns":
+        """
+        Selects a subset of rows. The result is re-sorted by ID
+        (a no-op for sorted inputs, since the sort is stable).
+        """
+
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) > 1:
+            indices = indices[np.argsort(self.ids[indices], kind="stable")]
+
+        columns, offsets = {}, {}
+        for field, kind, _ in FIELDS:
+            column = self.columns[field]
+            if kind == "str":
+                columns[field] = [column[i] for i in indices]
+            elif kind == "list":
+                src = self.offsets[field]
+                starts, lengths = src[indices], src[indices + 1] - src[indices]
+                offsets[field] = np.concatenate(([0], np.cumsum(lengths)))
+                gather = np.repeat(starts - offsets[field][:-1], lengths)
+                columns[field] = column[gather + np.arange(len(gather))]
+            else:
+                columns[field] = column[indices]
+
+        extras = {}
+        if self.extras:
+            inverse = {int(old): new for new, old in enumerate(indices)}
+            extras = {
+                inverse[old]: extra
+                for old, extra in self.extras.items()
+                if old in inverse
+            }
+
+        ret = PrideObjectColumns(self.mask[indices], columns, offsets, extras)
+        if self._fingerprints is not None:
+            ret._fingerprints = self._fingerprints[indices]
+        return ret
+
+    def concat(self, other: "PrideObjectColumns") -> "PrideObjectColumns":
+        """
+        Concatenates two column stores, re-sorted by ID.
+        Duplicate IDs are kept; deduplicate with take() beforehand if necessary.
+        """
+
+        n = len(self)
+        columns, offsets = {}, {}
+        for field, kind, _ in FIELDS:
+            a, b = self.columns[field], other.columns[field]
+            if kind == "str":
+                columns[field] = list(a) + list(b)
+            elif kind == "list":
+                columns[field] = np.concatenate((a, b))
+                offsets[field] = np.concatenate(
+                    (self.offsets[field], other.offsets[field][1:] + len(a))
+                )
+            else:
+                columns[field] = np.concatenate((a, b))
+
+        extras = dict(self.extras)
+        extras.update({i + n: extra for i, extra in other.extras.items()})
+
+        merged = PrideObjectColumns(
+            np.concatenate((self.mask, other.mask)), columns, offsets, extras
+        )
+        return merged.take(np.arange(len(merged)))
@@ -0,0 +1,132 @@
+"""
+graph.py
+[INTERNAL] Dependency graph of assetbundles, for planning downloads.
+"""
+
+from typing import Iterable
+
+import numpy as np
+
+from .columns import PrideObjectColumns
+
+
+class PrideDependencyGraph:
+    """
+    Directed graph of assetbundle rows, with an edge from each assetbundle
+    to every assetbundle listed in its 'dependencies' field.
+    Both directions are stored as CSR adjacency (row -> neighbour rows),
+    built in bulk from the columns without instantiating any object.
+    Dependencies not present in the columns (e.g. in a diff manifest) are dropped.
+
+    Attributes:
+        forward (Tuple[np.ndarray, np.ndarray]): Offsets and rows of the dependencies
+            of each row, i.e. the assetbundles it requires.
+        reverse (Tuple[np.ndarray, np.ndarray]): Offsets and rows of the dependents
+            of each row, i.e. the assetbundles requiring it.
+        dangling (int): Number of dropped edges to missing dependencies.
+
+    Methods:
+        dependencies(row: int) -> np.ndarray:
+            Returns the rows the specified row directly depends on.
+        dependents(row: int) -> np.ndarray:
+            Returns the rows directly depending on the specified row.
+        closure(rows: Iterable[int], reverse: bool = False) -> np.ndarray:
+            Returns the sorted rows reachable from 'rows', themselves included,
+            along dependencies (or dependents if 'reverse').
+        order(rows: Iterable[int]) -> list[int]:
+            Sorts rows so that every row comes after its dependencies among them,
+            and rows shared by more dependents among them come first otherwise.
+    """
+
+    forward: tuple[np.ndarray, np.ndarray]
+    reverse: tuple[np.ndarray, np.ndarray]
+    dangling: int
+
+    def __init__(self, columns: PrideObjectColumns):
+
+        ids = columns.ids
+        offsets = columns.offsets["dependencies"]
+        deps = columns.columns["dependencies"]
+        n = len(ids)
+
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        targets = ids.searchsorted(deps)
+        found = targets < n
+        found[found] = ids[targets[found]] == deps[found]
+        sources, targets = sources[found], targets[found]
+        self.dangling = int(len(deps) - found.sum())
+
+        self.forward = self._csr(sources, targets, n)
+        self.reverse = self._csr(targets, sources, n)
+
+    @staticmethod
+    def _csr(sources: np.ndarray, targets: np.ndarray, n: int) -> tuple:
+        order = np.argsort(sources, kind="stable")
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+        return offsets, targets[order].astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.forward[0]) - 1
+
+    @staticmethod
+    def _neighbours(csr: tuple, row: int) -> np.ndarray:
+        offsets, rows = csr
+        return rows[offsets.item(row) : offsets.item(row + 1)]
+
+    def dependencies(self, row: int) -> np.ndarray:
+        return self._neighbours(self.forward, row)
+
+    def dependents(self, row: int) -> np.ndarray:
+        return self._neighbours(self.reverse, row)
+
+    def closure(self, rows: Iterable[int], reverse: bool = False) -> np.ndarray:
+
+        offsets, neighbours = self.reverse if reverse else self.forward
+        seen = np.zeros(len(self), dtype=bool)
+        frontier = np.unique(np.fromiter(rows, dtype=np.int64))
+        seen[frontier] = True
+
+        # expand one level at a time, gathering all neighbours of the frontier at once
+        while len(frontier):
+            starts, ends = offsets[frontier], offsets[frontier + 1]
+            lengths = ends - starts
+            gather = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            reached = neighbours[gather + np.arange(len(gather))]
+            frontier = np.unique(reached[~seen[reached]])
+            seen[frontier] = True
+
+        return np.flatnonzero(seen)
+
+    def order(self, rows: Iterable[int]) -> list[int]:
+
+        rows = [int(row) for row in rows]
+        members = set(rows)
+
+        # height: length of the longest dependency chain below a row, within 'rows'
+        height, sharing = {}, {}
+        for root in rows:
+            if root in height:
+                continue
+            height[root] = None  # on stack, so cycles are cut here
+            stack = [(root, iter(self.dependencies(root).tolist()))]
+            while stack:
+                row, deps = stack[-1]
+                for dep in deps:
+                    if dep in members and dep not in height:
+                        height[dep] = None
+                        stack.append((dep, iter(self.dependencies(dep).tolist())))
+                        break
+                else:
+                    stack.pop()
+                    below = [
+                        height[dep]
+                        for dep in self.dependencies(row).tolist()
+                        if dep in members and height[dep] is not None
+                    ]
+                    height[row] = max(below, default=-1) + 1
+
+        for row in rows:
+            sharing[row] = sum(dep in members for dep in self.dependents(row).tolist())
+
+        return sorted(rows, key=lambda row: (height[row], -sharing[row]))
@@ -1,12 +1,15 @@
 """
 listing.py
-"Object list" class holding a list of dictionaries,
+"Object list" class holding a column store of object metadata,
 optimized for indexing and comparison.
 """
 
-from typing import Optional, Union
+from typing import Tuple, Union
+
+import numpy as np
 
 from ..object import PrideAssetBundle, PrideResource
+from .columns import PrideObjectColumns
 
 ObjectClass = Union[PrideAssetBundle, PrideResource]
 
@@ -14,92 +17,159 @@ ObjectClass = Union[PrideAssetBundle, PrideResource]
 class PrideObjectList:
     """
     A list of assetbundle/resource metadata, optimized for indexing and comparison.
-    Implemented as listing utility wrappers around a list of dictionaries.
+    Implemented as listing utility wrappers around a column store (see columns.py);
+    objects are only instantiated on access.
 
     Attributes:
-        infos (list): List of dictionaries containing metadata for each object.
+        columns (PrideObjectColumns): Column store of metadata, sorted by ID.
         base_class (object): The class that will be instantiated for each object.
         url_template (str): URL template for fetching the objects.
             Only used when instantiating objects from the list.
     """
 
-    infos: list[dict]
+    columns: PrideObjectColumns
     base_class: ObjectClass
     url_template: str
 
-    _objects: list[Optional[ObjectClass]]
-    _id_idx: dict[int, int]
-    _name_idx: dict[str, int]
+    _objects: dict[int, ObjectClass]
 
-    def __init__(self, infos: list[dict], base_class: ObjectClass, url_template: str):
-        infos.sort(key=lambda x: x["id"])
+    def __init__(
+        self,
+        infos: Union[list[dict], PrideObjectColumns],
+        base_class: ObjectClass,
+        url_template: str,
+    ):
+        if not isinstance(infos, PrideObjectColumns):
+            infos = PrideObjectColumns.from_infos(infos)
 
-        self.infos = infos
+        self.columns = infos
         self.base_class = base_class
         self.url_template = url_template
 
-        self._objects = [None] * len(infos)
-        self._id_idx = {info["id"]: i for i, info in enumerate(infos)}
-        self._name_idx = {info["name"]: i for i, info in enumerate(infos)}
-        # 'self._*_idx' are int/str -> int lookup tables
+        self._objects = {}  # row index -> instantiated object
 
     def __repr__(self) -> str:
-        return f"<PrideObjectList of {len(self.infos)} {self.base_class.__name__}'s>"
+        return f"<PrideObjectList of {len(self)} {self.base_class.__name__}'s>"
+
+    @property
+    def infos(self) -> list[dict]:
+        """
+        List of dictionaries containing metadata for each object.
+        Materialized from the column store on every access; prefer canon_repr.
+        """
+        return [self.columns.info(i) for i in range(len(self))]
 
     def _get_object(self, idx: int) -> ObjectClass:
         # necessary for enabling cache everywhere
-        if self._objects[idx] is None:
-            self._objects[idx] = self.base_class(self.infos[idx], self.url_template)
-        return self._objects[idx]
+        obj = self._objects.get(idx)
+        if obj is None:
+            obj = self.base_class(self.columns.info(idx), self.url_template)
+            self._objects[idx] = obj
+        return obj
 
     def __getitem__(self, key: Union[int, str]) -> ObjectClass:
 
         if isinstance(key, int):
-            idx = self._id_idx[key]
+            idx = self.columns.find_id(key)
         elif isinstance(key, str):
-            idx = self._name_idx[key]
+            idx = self.columns.find_name(key)
         else:
             raise TypeError  # just in case, should never reach here
 
         return self._get_object(idx)
 
     def __iter__(self):
-        for i in range(len(self.infos)):
+        for i in range(len(self)):
             yield self._get_object(i)
 
     def __len__(self) -> int:
-        return len(self.infos)
+        return len(self.columns)
 
     def __contains__(self, key: str) -> bool:
-        return key in self._name_idx
+        try:
+            self.columns.find_name(key)
+        except KeyError:
+            return False
+        return True
         # 'if <numerical ID> in self' is nonsensical
 
+    def diff(
+        self, other: "PrideObjectList"
+    ) -> Tuple["PrideObjectList", "PrideObjectList", "PrideObjectList"]:
+        """
+        Compares this (newer) list against another (older) one by name.
+        Each entry is hashed once into a fingerprint (see columns.py),
+        so no object is instantiated and no info dictionary is compared.
+
+        Returns:
+            Tuple[PrideObjectList, PrideObjectList, PrideObjectList]:
+                'added' and 'changed' entries from self,
+                and 'removed' entries from 'other'.
+        """
+
+        assert self.base_class == other.base_class
+        this, that = self.columns, other.columns
+
+        unchanged = np.isin(this.fingerprints, that.fingerprints)
+        this_names, that_names = set(this.names), set(that.names)
+        candidates = np.flatnonzero(~unchanged)
+        existing = np.fromiter(
+            (this.names[i] in that_names for i in candidates),
+            dtype=bool,
+            count=len(candidates),
+        )
+        removed = [i for i, name in enumerate(that.names) if name not in this_names]
+
+        return (
+            PrideObjectList(
+                this.take(candidates[~existing]), self.base_class, self.url_template
+            ),
+            PrideObjectList(
+                this.take(candidates[existing]), self.base_class, self.url_template
+            ),
+            PrideObjectList(that.take(removed), other.base_class, other.url_template),
+        )
+
     def __sub__(self, other: "PrideObjectList") -> "PrideObjectList":
+        # removed entries are dropped here; see diff() to retrieve them
         assert self.base_class == other.base_class
-        canon_reprs = []
-        for entry in self:
-            this_repr = entry.canon_repr
-            try:
-                other_repr = other[entry.name].canon_repr
-            except KeyError:
-                canon_reprs.append(this_repr)
-            else:
-                if this_repr != other_repr:
-                    canon_reprs.append(this_repr)
-        return PrideObjectList(canon_reprs, self.base_class, self.url_template)
+        unchanged = np.isin(self.columns.fingerprints, other.columns.fingerprints)
+        return PrideObjectList(
+            self.columns.take(np.flatnonzero(~unchanged)),
+            self.base_class,
+            self.url_template,
+        )
 
     def __add__(self, other: "PrideObjectList") -> "PrideObjectList":
         # 'other' is assumed to be newer, since revision is not accessible here
         assert self.base_class == other.base_class
-        mapped = {entry["id"]: entry for entry in self.canon_repr}
-        mapped.update({entry["id"]: entry for entry in other.canon_repr})  # hack
-        return PrideObjectList(
-            list(mapped.values()), self.base_class, self.url_template
+        kept = np.flatnonzero(~np.isin(self.columns.ids, other.columns.ids))
+        ret = PrideObjectList(
+            self.columns.take(kept).concat(other.columns),
+            self.base_class,
+            self.url_template,
         )
+        ret._adopt(self)
+        return ret
+
+    def _adopt(self, other: "PrideObjectList"):
+        """
+        [INTERNAL] Takes over the objects instantiated in 'other' whose info
+        is unchanged here, so that they keep their media and reporter.
+        """
+        if self.url_template != other.url_template:
+            return  # their URLs would be stale
+        for obj in list(other._objects.values()):
+            try:
+                idx = self.columns.find_id(obj.id)
+            except KeyError:
+                continue
+            if idx not in self._objects and self.columns.info(idx) == obj.canon_repr:
+                self._objects[idx] = obj
 
     @property
     def canon_repr(self) -> list[dict]:
         """
         [INTERNAL] Returns the JSON-compatible "canonical" representation of the object list.
         """
-        return [entry.canon_repr for entry in self]
+        return self.infos  # names are stored without the '.unity3d' suffix
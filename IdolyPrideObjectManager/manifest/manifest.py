@@ -4,24 +4,44 @@ Manifest decryption, exporting, and object downloading.
 """
 
 import asyncio
+import csv
+import heapq
 import json
-import re
+import os
 import subprocess
+from collections import defaultdict, deque
+from itertools import repeat
 from pathlib import Path
-from typing import Tuple, Union
+from typing import Iterator, Optional, Tuple, Union
 
-import pandas as pd
-import yaml
-from google.protobuf.json_format import ParseError
+import numpy as np
 from rich.progress import BarColumn, Progress, TextColumn
 
-from ..const import CHARACTER_ABBREVS, CSV_COLUMNS, DEFAULT_DOWNLOAD_PATH, PathArgtype
+from ..const import (
+    CSV_COLUMNS,
+    DEFAULT_DOWNLOAD_PATH,
+    DOWNLOAD_CPU_WORKERS,
+    DOWNLOAD_MAX_INFLIGHT,
+    DOWNLOAD_NET_WORKERS,
+    DOWNLOAD_ORDER,
+    DOWNLOAD_PROCESSES,
+    DOWNLOAD_QUEUE_SIZE,
+    DOWNLOAD_WORKERS,
+    SEARCH_PAGE_SIZE,
+    PathArgtype,
+)
 from ..object import PrideAssetBundle, PrideResource
 from ..rich import Logger
-from ..utils import nocache
+from ..utils import atomic_open, nocache
+from .columns import FIELD_NAMES
+from .graph import PrideDependencyGraph
 from .listing import PrideObjectList
-from .octodb_pb2 import dict2pdbytes
+from .octodb_pb2 import columns2pdbytes
+from .preset import PridePreset
 from .revision import PrideManifestRevision
+from .scheduler import PrideScheduler
+from .search import PrideSearchIndex
+from .sync import PrideSyncIndex
 
 ObjectClass = Union[PrideAssetBundle, PrideResource]
 
@@ -43,8 +63,16 @@ class PrideManifest:
     Methods:
         export(path: Union[str, Path]) -> None:
             Exports the manifest as ProtoDB, JSON, and/or CSV to the specified path.
+        diff(other: PrideManifest) -> Tuple[PrideManifest, PrideManifest]:
+            Differentiates against an older manifest, also reporting removed entries.
         search(criterion: str) -> list:
             Searches the manifest for objects with names *fully* matching the specified criterion.
+        search_page(criterion: str, page: int = 1, page_size: int = SEARCH_PAGE_SIZE) -> Tuple[list, int]:
+            Returns a page of the sorted search results, and the total number of matches.
+        dependencies(key: Union[int, str], recursive: bool = False) -> list[PrideAssetBundle]:
+            Returns the assetbundles the specified assetbundle depends on.
+        dependents(key: Union[int, str], recursive: bool = False) -> list[PrideAssetBundle]:
+            Returns the assetbundles depending on the specified assetbundle.
         download(
             *criteria: str,
             path: Union[str, Path] = DEFAULT_DOWNLOAD_PATH,
@@ -64,6 +92,9 @@ class PrideManifest:
     resources: PrideObjectList
     urlformat: str
 
+    _search_index: Optional[PrideSearchIndex] = None
+    _dependency_graph: Optional[PrideDependencyGraph] = None
+
     def __init__(self, jdict: dict, base_revision: int = 0):
         """
         [INTERNAL] Initializes a manifest from the given JSON dictionary.
@@ -71,7 +102,9 @@ class PrideManifest:
         Args:
             jdict (dict): JSON-serialized dictionary extracted from protobuf.
                 Must contain 'revision' and 'urlFormat' fields.
-                May contain 'assetBundleList' and 'resourceList'.
+                May contain 'assetBundleList' and 'resourceList',
+                either as lists of info dictionaries or as PrideObjectColumns
+                (see octodb_pb2.pdbytes2columns()).
             base_revision (int) = 0: The revision number of the base manifest.
                 Manually specified when loading a diff, at which case
                 a warning of conflict is raised if jdict['revision'] is already a tuple.
@@ -141,6 +174,38 @@ class PrideManifest:
             }
         )
 
+    def diff(self, other: "PrideManifest") -> Tuple["PrideManifest", "PrideManifest"]:
+        """
+        Differentiates this manifest against an older one.
+
+        Returns:
+            Tuple[PrideManifest, PrideManifest]: Two manifests of the diff revision,
+                the first holding entries added or changed in self (same as self - other),
+                and the second holding entries of 'other' no longer present in self.
+        """
+
+        revision = self.revision - other.revision  # handles sanity check
+        ab_added, ab_changed, ab_removed = self.assetbundles.diff(other.assetbundles)
+        rs_added, rs_changed, rs_removed = self.resources.diff(other.resources)
+
+        updated = PrideManifest(
+            {
+                "revision": revision,
+                "assetBundleList": ab_added + ab_changed,  # disjoint, merged by ID
+                "resourceList": rs_added + rs_changed,
+                "urlFormat": self.urlformat,
+            }
+        )
+        removed = PrideManifest(
+            {
+                "revision": revision,
+                "assetBundleList": ab_removed,
+                "resourceList": rs_removed,
+                "urlFormat": self.urlformat,
+            }
+        )
+        return updated, removed
+
     def __add__(self, other: "PrideManifest") -> "PrideManifest":
         new_revision = self.revision + other.revision
         a, b = (
@@ -227,15 +292,20 @@ class PrideManifest:
         if path.suffix != ".pdb":
             logger.warning("Attempting to write ProtoDB into a non-.pdb file")
 
-        jdict = self.canon_repr
-        if isinstance(jdict["revision"], tuple):
+        if self.revision.base != 0:
             logger.warning("Exporting a diff manifest as ProtoDB, base revision lost")
-            jdict["revision"] = jdict["revision"][0]
 
         try:
-            path.write_bytes(dict2pdbytes(jdict))
+            pdb = columns2pdbytes(
+                self.revision.this,
+                self.urlformat,
+                self.assetbundles.columns,
+                self.resources.columns,
+            )
+            with atomic_open(path, "wb") as f:
+                f.write(pdb)
             logger.success(f"ProtoDB has been written into {path}")
-        except ParseError:
+        except ValueError:  # unrecognized fields, or values out of range
             logger.error(f"Failed to write ProtoDB into {path}")
 
     def _export_json(self, path: Path):
@@ -247,11 +317,57 @@ class PrideManifest:
             logger.warning("Attempting to write JSON into a non-.json file")
 
         try:
-            path.write_text(json.dumps(self.canon_repr, indent=4))
+            with atomic_open(path, "w", encoding="utf-8") as f:
+                f.writelines(self._iter_json())
             logger.success(f"JSON has been written into {path}")
         except TypeError:  # non-JSON-serializable object in dict
             logger.error(f"Failed to write JSON into {path}")
 
+    def _iter_json(self) -> Iterator[str]:
+        """
+        [INTERNAL] Yields json.dumps(self.canon_repr, indent=4) in chunks,
+        materializing one entry at a time.
+        """
+
+        encoder = json.JSONEncoder(indent=4)
+        encode = json.JSONEncoder().encode
+        encode_str = json.encoder.encode_basestring_ascii  # C-accelerated
+
+        def indented(obj, level: int) -> str:
+            return encoder.encode(obj).replace("\n", "\n" + " " * 4 * level)
+
+        def value(v) -> str:
+            if type(v) is str:
+                return encode_str(v)
+            if type(v) is int:
+                return int.__repr__(v)
+            if isinstance(v, (list, dict)):
+                return indented(v, 3)
+            return encode(v)
+
+        def entry(info: dict) -> str:
+            if not info:
+                return "{}"
+            return (
+                "{\n            "
+                + ",\n            ".join(
+                    f"{encode_str(k)}: {value(v)}" for k, v in info.items()
+                )
+                + "\n        }"
+            )
+
+        yield '{\n    "revision": ' + indented(self.revision.canon_repr, 1)
+        for key, objects in [
+            ("assetBundleList", self.assetbundles),
+            ("resourceList", self.resources),
+        ]:
+            yield f',\n    "{key}": ['
+            columns = objects.columns
+            for i in range(len(columns)):
+                yield ("," if i else "") + "\n        " + entry(columns.info(i))
+            yield "\n    ]" if len(columns) else "]"
+        yield ',\n    "urlFormat": ' + encode(self.urlformat) + "\n}"
+
     def _export_csv(self, path: Path):
         """
         [INTERNAL] Writes CSV-serialized data into the specified path.
@@ -262,23 +378,45 @@ class PrideManifest:
         if path.suffix != ".csv":
             logger.warning("Attempting to write CSV into a non-.csv file")
 
-        # [RESOLVED] Forced list conversion is necessary since PrideObjectList overrides __iter__,
-        # which handles integer keys (index by ID) and messes up with standard modules
-        # like pandas that rely on self[0] as a "sample" object from the list.
-        dfa = pd.DataFrame(self.assetbundles.canon_repr, columns=CSV_COLUMNS)
-        dfa["name"] = dfa["name"].apply(
-            lambda x: x if "." in x else x + ".unity3d"
-        )  # stripped in canon
-        dfr = pd.DataFrame(self.resources.canon_repr, columns=CSV_COLUMNS)
-        df = pd.concat([dfa, dfr], ignore_index=True)
-        df.sort_values("name", inplace=True)
-
         try:
-            df.to_csv(path, index=False)
+            with atomic_open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(CSV_COLUMNS)
+                writer.writerows(self._iter_csv())
             logger.success(f"CSV has been written into {path}")
         except:
             logger.error(f"Failed to write CSV into {path}")
 
+    def _iter_csv(self) -> Iterator[list]:
+        """
+        [INTERNAL] Yields CSV rows of assetbundles and resources, merged by name.
+        Output matches the former pandas-based exporter, which sorted
+        the concatenated table by name and wrote missing cells as empty.
+        """
+
+        bits = [FIELD_NAMES.index(field) for field in CSV_COLUMNS]
+        name_col = CSV_COLUMNS.index("name")
+
+        sources = []
+        for objects, suffixed in [(self.assetbundles, True), (self.resources, False)]:
+            columns = objects.columns
+            if suffixed:  # stripped in canon, and suffixing may reorder names
+                names = [x if "." in x else x + ".unity3d" for x in columns.names]
+                order = sorted(range(len(names)), key=names.__getitem__)
+            else:
+                names = columns.names
+                order = columns.name_order.tolist()
+            sources.append(zip(map(names.__getitem__, order), repeat(columns), order))
+
+        for name, columns, i in heapq.merge(*sources, key=lambda x: x[0]):
+            m = columns.mask.item(i)
+            row = [
+                columns.value(field, i) if m >> bit & 1 else ""
+                for field, bit in zip(CSV_COLUMNS, bits)
+            ]
+            row[name_col] = name
+            yield row
+
     # ----------- DOWNLOAD ----------- #
 
     def search(
@@ -286,6 +424,7 @@ class PrideManifest:
         criterion: str,
         by_name: bool = True,
         ascending: bool = True,
+        with_dependencies: bool = False,
     ) -> list[ObjectClass]:
         """
         Searches the manifest for objects matching the specified criterion.
@@ -293,19 +432,179 @@ class PrideManifest:
 
         Args:
             criterion (str): Regex pattern of object names.
+            with_dependencies (bool) = False: Whether to also include
+                the transitive dependencies of matched assetbundles.
         """
 
         # This will be called by frontend; we instantiate here to make ID's visible.
-        matches = filter(
-            lambda s: re.match(criterion, s.name, flags=re.IGNORECASE) is not None,
-            list(self),
-        )
+        # Only matches are instantiated, candidates are narrowed by the index first.
+        rows = self.search_index.search(criterion)
+        if with_dependencies:  # assetbundles come first in the index, same rows
+            n = len(self.assetbundles)
+            closure = self.dependency_graph.closure(i for i in rows if i < n)
+            rows = sorted(set(rows).union(closure.tolist()))
+        matches = [self._get_object(i) for i in rows]
         return sorted(
             matches,
             key=lambda x: x.name if by_name else x.id,
             reverse=not ascending,
         )
 
+    def search_page(
+        self,
+        criterion: str,
+        by_name: bool = True,
+        ascending: bool = True,
+        page: int = 1,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> Tuple[list[ObjectClass], int]:
+        """
+        Searches the manifest like search(), but only instantiates and returns
+        one page of the sorted matches, along with the total number of matches.
+        Matches are ordered from the presorted rows of the search index,
+        so no sort scales with the number of matches.
+
+        Args:
+            criterion (str): Regex pattern of object names.
+            by_name (bool) = True: Whether to sort by name, case-insensitively
+                unlike search(), or else by ID with assetbundles before resources.
+            ascending (bool) = True: Whether to sort in ascending order.
+            page (int) = 1: 1-based page number, past the last page for an empty one.
+            page_size (int) = SEARCH_PAGE_SIZE: Number of matches per page.
+        """
+
+        assert page >= 1 and page_size >= 1, "Page and page size must be positive"
+
+        index = self.search_index
+        rows = np.asarray(index.search(criterion), dtype=np.int64)
+        if by_name:
+            rows = index.sort_by_name(rows)
+        # otherwise rows are already by ID, assetbundles first
+        if not ascending:
+            rows = rows[::-1]
+
+        start = (page - 1) * page_size
+        selected = rows[start : start + page_size].tolist()
+        return [self._get_object(i) for i in selected], len(rows)
+
+    def _get_object(self, row: int) -> ObjectClass:
+        """
+        [INTERNAL] Instantiates the object at a row of the search index,
+        where assetbundles are followed by resources.
+        """
+        n = len(self.assetbundles)
+        if row < n:
+            return self.assetbundles._get_object(row)
+        return self.resources._get_object(row - n)
+
+    @property
+    def search_index(self) -> PrideSearchIndex:
+        """
+        [INTERNAL] Trigram index over object names, built on first search.
+        """
+        if self._search_index is None:
+            self._search_index = PrideSearchIndex(
+                [name + ".unity3d" for name in self.assetbundles.columns.names]
+                + list(self.resources.columns.names)
+            )
+        return self._search_index
+
+    @property
+    def dependency_graph(self) -> PrideDependencyGraph:
+        """
+        [INTERNAL] Dependency graph over assetbundle rows, built on first use.
+        """
+        if self._dependency_graph is None:
+            self._dependency_graph = PrideDependencyGraph(self.assetbundles.columns)
+        return self._dependency_graph
+
+    def dependencies(
+        self, key: Union[int, str], recursive: bool = False
+    ) -> list[PrideAssetBundle]:
+        """
+        Returns the assetbundles the specified assetbundle depends on, sorted by ID.
+
+        Args:
+            key (Union[int, str]): ID or name of an assetbundle.
+            recursive (bool) = False: Whether to include indirect dependencies.
+        """
+        return self._neighbours(key, recursive, reverse=False)
+
+    def dependents(
+        self, key: Union[int, str], recursive: bool = False
+    ) -> list[PrideAssetBundle]:
+        """
+        Returns the assetbundles depending on the specified assetbundle, sorted by ID.
+
+        Args:
+            key (Union[int, str]): ID or name of an assetbundle.
+            recursive (bool) = False: Whether to include indirect dependents.
+        """
+        return self._neighbours(key, recursive, reverse=True)
+
+    def _neighbours(
+        self, key: Union[int, str], recursive: bool, reverse: bool
+    ) -> list[PrideAssetBundle]:
+        """
+        [INTERNAL] Backend of dependencies() and dependents().
+        """
+
+        columns, graph = self.assetbundles.columns, self.dependency_graph
+        row = columns.find_id(key) if isinstance(key, int) else columns.find_name(key)
+
+        if recursive:
+            rows = graph.closure([row], reverse=reverse)
+            rows = rows[rows != row]
+        elif reverse:
+            rows = np.sort(graph.dependents(row))
+        else:
+            rows = np.sort(graph.dependencies(row))
+
+        return [self.assetbundles._get_object(i) for i in rows.tolist()]
+
+    def _with_dependencies(
+        self, obj_kw: list[Tuple[ObjectClass, dict]]
+    ) -> list[Tuple[ObjectClass, dict]]:
+        """
+        [INTERNAL] Adds the transitive dependencies of the assetbundles in 'obj_kw',
+        each once, with the kwargs of a (transitive) dependent that requires it.
+        Assetbundles are reordered so that dependencies, and shared ones foremost,
+        come before their dependents; resources follow in their original order.
+        """
+
+        columns, graph = self.assetbundles.columns, self.dependency_graph
+
+        jobs = defaultdict(list)  # assetbundle row -> its object-kwargs pairs
+        resources = []
+        for obj, kw in obj_kw:
+            if isinstance(obj, PrideAssetBundle):
+                jobs[columns.find_id(obj.id)].append((obj, kw))
+            else:
+                resources.append((obj, kw))
+
+        selected = len(jobs)
+        order = graph.order(graph.closure(list(jobs)).tolist())
+
+        # kwargs propagate breadth-first from the selection, so that cycles,
+        # which 'order' cuts anywhere, are never reached before a dependent
+        queue = deque(jobs)
+        while queue:
+            row = queue.popleft()
+            kw = jobs[row][0][1]
+            for dep in graph.dependencies(row).tolist():
+                if dep not in jobs:
+                    jobs[dep] = [(self.assetbundles._get_object(dep), kw)]
+                    queue.append(dep)
+
+        if len(jobs) > selected:
+            logger.info(
+                f"Added {len(jobs) - selected} dependencies of {selected} assetbundles"
+            )
+        if graph.dangling:
+            logger.warning(f"{graph.dangling} dependencies are missing from manifest")
+
+        return [pair for row in order for pair in jobs.get(row, ())] + resources
+
     @nocache
     def download(self, *criteria: str, **kwargs):
         """
@@ -317,10 +616,33 @@ class PrideManifest:
                 *WARNING: Behavior is undefined if the path points to an definite file (with extension).*
             categorize (bool) = True: Whether to categorize downloaded objects into subdirectories.
                 If False, all objects are downloaded to the specified 'path' in a flat structure.
+            sync (bool) = False: Whether to skip objects whose outputs under 'path' are
+                recorded as current in its sync index (see manifest/sync.py),
+                and overwrite the others instead of aborting on existing files.
+            prune (bool) = False: In sync mode, whether to also delete outputs that
+                no longer match, including those of objects not downloaded this time.
+                Only meant for runs covering the whole 'path', e.g. download_all().
+            net_workers (int) = DOWNLOAD_NET_WORKERS: Number of threads fetching objects,
+                i.e. maximum number of concurrent transfers.
+            workers (int) = DOWNLOAD_WORKERS: Number of threads exporting fetched objects
+                (deobfuscating, converting, and writing).
+            cpu_workers (int) = DOWNLOAD_CPU_WORKERS: Maximum number of concurrent conversions.
+            order (str) = DOWNLOAD_ORDER: Processing order, '' (as listed),
+                'largest' or 'smallest' first.
+            max_inflight (int) = DOWNLOAD_MAX_INFLIGHT: Maximum total size in bytes
+                of the objects being processed at once, bounding memory usage.
+            queue_size (int) = DOWNLOAD_QUEUE_SIZE: Number of objects that may wait
+                in front of each stage, fetched objects waiting for export included.
+            processes (int) = DOWNLOAD_PROCESSES: Number of worker processes to
+                convert media in, bypassing the GIL. If 0, converts in download threads.
+            with_dependencies (bool) = False: Whether to also download the transitive
+                dependencies of the assetbundles, each once, next to a dependent.
+                Dependencies are then processed before their dependents,
+                unless 'order' is also specified.
         """
 
         if "preset" in kwargs:
-            self.download_preset(kwargs.pop("preset"))
+            self.download_preset(kwargs.pop("preset"), **kwargs)
             return
 
         if not criteria:
@@ -338,66 +660,59 @@ class PrideManifest:
         asyncio.run(self._dispatch(objects, **kwargs))
 
     @nocache
-    def download_preset(self, preset_filename: str):
+    def download_preset(self, preset_filename: str, **kwargs):
         """
         [INTERNAL] Downloads by a predefined preset (see examples in presets/).
+        Keyword arguments, e.g. 'sync' and 'prune' (see download()),
+        override the 'global-kwargs' of the preset and sync against its root.
         """
 
-        # READ PRESET
-
-        with open(preset_filename, "r", encoding="utf-8") as f:
-            preset = yaml.safe_load(f)
+        preset = PridePreset(preset_filename, f"v{self.revision.canon_repr}")
 
-        root = preset.get("root", DEFAULT_DOWNLOAD_PATH)
-        root = root.replace("{revision}", f"v{self.revision.canon_repr}")
+        # CLASSIFY
 
-        global_kwargs = preset.get("global-kwargs", {})
-        proto_instrs = preset.get("instructions", [])
+        names = self.search_index.names
+        claims = preset.classify(self.search_index)
 
-        pp_path = preset.get("post-processing", "")
-        if pp_path:
-            pp_path = Path(preset_filename).parent / pp_path
+        obj_kw = []
+        targets = defaultdict(list)  # object row -> its claiming instructions
+        counts = defaultdict(int)  # source instruction -> number of objects
 
-        # PARSE INSTRUCTIONS
+        for k, rows in enumerate(claims):
+            source, _, kw = preset.instructions[k]
+            counts[source] += len(rows)
+            for i in sorted(rows, key=names.__getitem__):
+                # the same target may be claimed twice, e.g. by {char} expansions
+                # of a criterion whose subdir does not depend on {char}
+                if kw not in targets[i]:
+                    targets[i].append(kw)
+                    obj_kw.append((self._get_object(i), kw))
 
-        instrs = []
+        # REPORT
 
-        for instr in proto_instrs:
-
-            criterion = instr.pop("criterion", "")
-            subdir = instr.pop("subdir", "")
-
-            if "{char}" not in criterion:
-                assert "{char}" not in subdir, "Standalone {char} flag in subdir"
-                instrs.append((criterion, {"path": Path(root, subdir), **instr}))
-            else:
-                for char in CHARACTER_ABBREVS[:12]:  # hardcoded
-                    instrs.append(
-                        (
-                            criterion.replace("{char}", char),
-                            {
-                                "path": Path(root, subdir.replace("{char}", char)),
-                                **instr,
-                            },
-                        )
-                    )
+        for source, count in sorted(counts.items()):
+            logger.info(f"Instruction #{source + 1} matched {count} objects")
+        conflicts = [i for i, kws in targets.items() if len(kws) > 1]
+        if conflicts:
+            logger.warning(
+                f"{len(conflicts)} objects are claimed by multiple instructions "
+                f"and will be downloaded to each target, e.g. {names[conflicts[0]]}"
+            )
+        if not obj_kw:
+            logger.warning("No object matched by preset, aborting")
+            return
 
         # DISPATCH
 
         asyncio.run(
             self._dispatch(
-                [
-                    (obj, kw)
-                    for criterion, kw in instrs
-                    for obj in self.search(criterion)
-                ],
-                **global_kwargs,
+                obj_kw, sync_root=preset.root, **{**preset.global_kwargs, **kwargs}
             )
         )
 
-        if pp_path:
-            logger.info(f"Running post-processing script '{pp_path}'")
-            subprocess.run(["python", pp_path, root], check=True)
+        if preset.pp_path:
+            logger.info(f"Running post-processing script '{preset.pp_path}'")
+            subprocess.run(["python", preset.pp_path, preset.root], check=True)
 
     @nocache
     def download_all_assetbundles(self, **kwargs):
@@ -426,15 +741,51 @@ class PrideManifest:
     async def _dispatch(
         self,
         obj_kw: list[Union[ObjectClass, Tuple[ObjectClass, dict]]],
+        sync: bool = False,
+        prune: bool = False,
+        sync_root: Optional[PathArgtype] = None,
+        workers: int = DOWNLOAD_WORKERS,
+        net_workers: int = DOWNLOAD_NET_WORKERS,
+        cpu_workers: int = DOWNLOAD_CPU_WORKERS,
+        order: str = DOWNLOAD_ORDER,
+        max_inflight: int = DOWNLOAD_MAX_INFLIGHT,
+        queue_size: int = DOWNLOAD_QUEUE_SIZE,
+        processes: int = DOWNLOAD_PROCESSES,
+        with_dependencies: bool = False,
         **kwargs,
     ):
         """
-        [INTERNAL] Dispatches a list of object-kwargs pairs to async download tasks.
+        [INTERNAL] Dispatches a list of object-kwargs pairs to a download pipeline,
+        where objects are fetched into the object store, then exported.
+        In sync mode, the index lives in 'sync_root', defaulting to the 'path' kwarg.
         """
 
         # if "obj_kw" is a list of objects, append empty kwargs
         if not isinstance(obj_kw[0], tuple):
             obj_kw = [(obj, {}) for obj in obj_kw]
+        if with_dependencies:
+            obj_kw = self._with_dependencies(obj_kw)
+
+        scheduler = PrideScheduler(
+            net_workers, cpu_workers, order, max_inflight, queue_size, processes
+        )
+
+        index, targets = None, [None] * len(obj_kw)
+        if sync:
+            index = PrideSyncIndex(
+                sync_root or kwargs.get("path", DEFAULT_DOWNLOAD_PATH), prune=prune
+            )
+            targets = [index.target(obj, {**kw, **kwargs}) for obj, kw in obj_kw]
+            jobs = [
+                (obj, {**kw, "force_overwrite": True}, target)
+                for (obj, kw), target in zip(obj_kw, targets)
+                if not index.is_current(target, obj, {**kw, **kwargs})
+            ]
+            logger.info(
+                f"{len(targets) - len(jobs)} of {len(targets)} objects up to date"
+            )
+        else:
+            jobs = [(obj, dict(kw), None) for obj, kw in obj_kw]  # kw is per job
 
         progress = Progress(
             TextColumn("{task.description}"),
@@ -442,19 +793,49 @@ class PrideManifest:
             TextColumn("{task.completed}/{task.total}"),
         )
 
-        tasks = [
-            asyncio.create_task(
-                asyncio.to_thread(
-                    obj.download,
+        def fetch(obj: ObjectClass, kw: dict, target: Optional[str]):
+            # tasks are only registered once admitted, and removed when done
+            kw["task_id"] = progress.add_task(obj._idname, visible=False)
+            try:
+                obj._prefetch(
                     progress=progress,
-                    task_id=progress.add_task(obj._idname, visible=False),
+                    scheduler=scheduler,
                     **kw,
                     **kwargs,  # if not empty, broadcast to all tasks
                 )
-            )
-            for obj, kw in obj_kw
-        ]
+            except Exception:
+                progress.remove_task(kw["task_id"])
+                raise
+
+        def export(obj: ObjectClass, kw: dict, target: Optional[str]):
+            try:
+                outputs = obj.download(
+                    progress=progress, scheduler=scheduler, **kw, **kwargs
+                )
+            finally:
+                if kw["task_id"] in progress.task_ids:  # not removed by success()
+                    progress.remove_task(kw["task_id"])
+            if index is not None:
+                index.record(target, obj, {**kw, **kwargs}, outputs)
 
         progress.start()
-        await asyncio.gather(*tasks)
-        progress.stop()
+        try:
+            stats = await scheduler.run(
+                jobs, [("fetch", fetch, net_workers), ("export", export, workers)]
+            )
+        finally:
+            progress.stop()
+            if index is not None:
+                index.finish(targets)
+
+        for name, stage in scheduler.stats.items():
+            logger.info(
+                f"Stage '{name}': {stage['objects']} objects, busy {stage['seconds']:.1f}s, "
+                f"queue depth up to {stage['max_depth']}/{queue_size}"
+            )
+        if stats["objects"]:
+            size, seconds = stats["bytes"] / 2**20, max(stats["seconds"], 1e-6)
+            logger.info(
+                f"Processed {stats['objects']} objects ({size:.1f} MiB) in {seconds:.1f}s, "
+                f"{stats['objects'] / seconds:.1f} objects/s, {size / seconds:.1f} MiB/s"
+            )
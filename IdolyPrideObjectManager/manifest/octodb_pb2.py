@@ -13,6 +13,8 @@ from google.protobuf import symbol_database as _symbol_database
 from google.protobuf.internal import builder as _builder
 from google.protobuf.json_format import MessageToDict, ParseDict
 
+from .columns import FIELDS, PrideObjectColumns
+
 # @@protoc_insertion_point(imports)
 
 _sym_db = _symbol_database.Default()
@@ -84,3 +86,45 @@ def pdbytes2dict(pdb: bytes) -> dict:
 
 def dict2pdbytes(jdict: dict) -> bytes:
     return ParseDict(jdict, Database()).SerializeToString()
+
+
+# Interface between ProtoDB bytestring and PrideObjectColumns,
+# bypassing the intermediate JSON dictionaries above
+
+
+def pdbytes2columns(pdb: bytes) -> dict:
+    db = Database().FromString(pdb)
+    return {
+        "revision": db.revision,
+        "assetBundleList": PrideObjectColumns.from_messages(db.assetBundleList),
+        "resourceList": PrideObjectColumns.from_messages(db.resourceList),
+        "urlFormat": db.urlFormat,
+    }
+
+
+def columns2pdbytes(
+    revision: int,
+    url_format: str,
+    assetbundles: PrideObjectColumns,
+    resources: PrideObjectColumns,
+) -> bytes:
+    db = Database(revision=revision, urlFormat=url_format)
+    for messages, columns in [
+        (db.assetBundleList, assetbundles),
+        (db.resourceList, resources),
+    ]:
+        if columns.extras:
+            raise ValueError("Unrecognized fields cannot be written into ProtoDB")
+        values = {}
+        for field, kind, _ in FIELDS:
+            column = columns.columns[field]
+            if kind == "str":
+                values[field] = list(column)
+            elif kind == "list":
+                flat, offsets = column.tolist(), columns.offsets[field].tolist()
+                values[field] = [flat[i:j] for i, j in zip(offsets, offsets[1:])]
+            else:  # default values are not serialized, same as absent fields
+                values[field] = column.tolist()
+        for row in zip(*values.values()):
+            messages.add(**dict(zip(values.keys(), row)))
+    return db.SerializeToString()
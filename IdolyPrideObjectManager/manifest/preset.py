@@ -0,0 +1,81 @@
+"""
+preset.py
+[INTERNAL] Download preset parsing and object classification.
+"""
+
+from pathlib import Path
+
+import yaml
+
+from ..const import CHARACTER_ABBREVS, DEFAULT_DOWNLOAD_PATH
+from .search import PrideSearchIndex
+
+
+class PridePreset:
+    """
+    A download preset (see examples in presets/), with its '{char}' instructions
+    expanded, classifying objects through a manifest's search index.
+
+    Attributes:
+        root (str): Root download directory, with '{revision}' substituted.
+        global_kwargs (dict): Keyword arguments broadcast to all downloads.
+        instructions (list[tuple[int, str, dict]]): Expanded instructions as
+            (index of the source instruction in the preset, criterion, download kwargs).
+        pp_path (str): Path to the post-processing script, or empty if none.
+
+    Methods:
+        classify(index: PrideSearchIndex) -> list[list[int]]:
+            Returns, for each expanded instruction, the index rows it matches.
+    """
+
+    root: str
+    global_kwargs: dict
+    instructions: list[tuple[int, str, dict]]
+    pp_path: str
+
+    def __init__(self, preset_filename: str, revision: str):
+
+        with open(preset_filename, "r", encoding="utf-8") as f:
+            preset = yaml.safe_load(f)
+
+        self.root = preset.get("root", DEFAULT_DOWNLOAD_PATH)
+        self.root = self.root.replace("{revision}", revision)
+
+        self.global_kwargs = preset.get("global-kwargs", {})
+        proto_instrs = preset.get("instructions", [])
+
+        self.pp_path = preset.get("post-processing", "")
+        if self.pp_path:
+            self.pp_path = Path(preset_filename).parent / self.pp_path
+
+        self.instructions = []
+
+        for source, instr in enumerate(proto_instrs):
+
+            criterion = instr.pop("criterion", "")
+            subdir = instr.pop("subdir", "")
+
+            if "{char}" not in criterion:
+                assert "{char}" not in subdir, "Standalone {char} flag in subdir"
+                self.instructions.append(
+                    (source, criterion, {"path": Path(self.root, subdir), **instr})
+                )
+            else:
+                for char in CHARACTER_ABBREVS[:12]:  # hardcoded
+                    self.instructions.append(
+                        (
+                            source,
+                            criterion.replace("{char}", char),
+                            {
+                                "path": Path(self.root, subdir.replace("{char}", char)),
+                                **instr,
+                            },
+                        )
+                    )
+
+    def classify(self, index: PrideSearchIndex) -> list[list[int]]:
+        # criteria shared by several instructions are only searched once
+        matches = {c: None for _, c, _ in self.instructions}
+        for criterion in matches:
+            matches[criterion] = index.search(criterion)
+        return [matches[c] for _, c, _ in self.instructions]
@@ -0,0 +1,102 @@
+"""
+refresher.py
+[INTERNAL] Background refresh of a long-lived manifest, e.g. the one served by server.py.
+"""
+
+import threading
+from typing import Optional
+
+from ..const import MANIFEST_REFRESH_INTERVAL
+from ..rich import Logger
+from . import _request_pdb, fetch, snapshots
+from .manifest import PrideManifest
+from .octodb_pb2 import pdbytes2columns
+from .snapshot import source_key
+
+logger = Logger()
+
+
+class PrideManifestRefresher:
+    """
+    Holds a live manifest, warm-started from the latest snapshot on disk
+    however old, and periodically fetches only the diff since its revision
+    in a daemon thread. Diffs are applied with PrideManifest.__add__,
+    which keeps unchanged objects instantiated, and their media caches are keyed
+    by MD5 anyway (see media/cache.py). The live manifest is replaced as a whole,
+    so readers always see a consistent revision.
+
+    Attributes:
+        manifest (Optional[PrideManifest]): Live manifest, None before the first access.
+        interval (float): Seconds between refreshes, 0 to never refresh.
+
+    Methods:
+        current() -> PrideManifest:
+            Returns the live manifest, loading it and starting refreshes on first call.
+        refresh() -> bool:
+            Applies the diff since the live revision, returning whether there was one.
+        stop() -> None:
+            Stops refreshing after the one in progress, if any.
+    """
+
+    manifest: Optional[PrideManifest] = None
+    interval: float
+
+    _lock: threading.Lock
+    _stop: threading.Event
+    _thread: Optional[threading.Thread] = None
+
+    def __init__(self, interval: float = MANIFEST_REFRESH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def current(self) -> PrideManifest:
+
+        if self.manifest is None or self._thread is None:
+            with self._lock:
+                if self.manifest is None:
+                    self.manifest = snapshots.get_latest(0, float("inf")) or fetch()
+                    logger.info(f"Serving manifest {self.manifest.revision}")
+                if self._thread is None and self.interval > 0:
+                    self._thread = threading.Thread(
+                        target=self._run, name="ipom-refresher", daemon=True
+                    )
+                    self._thread.start()
+
+        return self.manifest
+
+    def _run(self):
+        delay = 0  # the snapshot may be old, catch up right away
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.refresh()
+            except Exception as e:  # keep serving the current one, retry later
+                logger.warning(f"Failed to refresh manifest: {e}")
+
+    def refresh(self) -> bool:
+
+        current = self.manifest
+        base = current.revision.this
+        # diffs go stale on every update, don't fill the snapshot cache with them
+        columns = pdbytes2columns(_request_pdb(base))
+        if columns["revision"] <= base:  # the server has nothing newer
+            return False
+
+        diff = PrideManifest(columns, base_revision=base)
+        merged = current + diff
+        self.manifest = merged  # atomic swap, requests in flight keep the old one
+        logger.info(
+            f"Refreshed manifest to {merged.revision} "
+            f"with {len(diff)} objects added or updated"
+        )
+
+        # the next warm start begins from here; not parsed from any source,
+        # so the revision alone identifies it
+        key = source_key(str(merged.revision).encode("utf-8"))
+        snapshots.put(key, merged)
+        snapshots.set_latest(0, key)
+        return True
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,207 @@
+"""
+scheduler.py
+[INTERNAL] Bounded, size-aware scheduling of object downloads.
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+from ..const import (
+    DOWNLOAD_CPU_WORKERS,
+    DOWNLOAD_MAX_INFLIGHT,
+    DOWNLOAD_NET_WORKERS,
+    DOWNLOAD_ORDER,
+    DOWNLOAD_PROCESSES,
+    DOWNLOAD_QUEUE_SIZE,
+)
+from ..object import PrideAssetBundle, PrideResource
+
+ObjectClass = Union[PrideAssetBundle, PrideResource]
+
+ORDERS = ["", "largest", "smallest"]
+_START_METHODS = multiprocessing.get_all_start_methods()
+
+
+class PrideScheduler:
+    """
+    Runs object downloads through a pipeline of stages connected by bounded queues,
+    each stage with its own pool of worker threads, so that e.g. transfers
+    of some objects overlap conversions of others. Objects are admitted one by one
+    in the specified order while under the in-flight byte budget, and an object
+    leaves the pipeline early if a stage fails on it. Within each stage,
+    transfers and conversions also hold a slot of their own (see ProgressReporter.limit()).
+    Optionally, conversions are handed to a pool of worker processes,
+    leaving threads to fetch and verify bytes (see PrideDummyMedia.converted).
+
+    Attributes:
+        network (threading.BoundedSemaphore): Slots for concurrent transfers.
+        cpu (threading.BoundedSemaphore): Slots for concurrent media conversions.
+        order (str): Admission order, '' (as given), 'largest', or 'smallest' first.
+        max_inflight (int): Maximum total size in bytes of the objects in the pipeline.
+            An object larger than this is only admitted when the pipeline is empty.
+        queue_size (int): Capacity of the queue in front of each stage.
+        processes (int): Number of conversion worker processes, 0 to convert in threads.
+        converter (Optional[ProcessPoolExecutor]): Conversion worker pool,
+            only alive during run().
+        stats (dict[str, dict]): Stage name -> number of objects processed,
+            seconds spent by its workers, and maximum depth of its queue.
+
+    Methods:
+        run(jobs: list[tuple], stages: list[tuple[str, Callable, int]]) -> dict:
+            [ASYNC] Passes each job, whose first element is the object, through the
+            stages as (name, fn, workers), calling fn(*job) in each.
+            Stops admitting jobs after the first failure, and re-raises it
+            once admitted jobs drain. Returns the number of objects that went
+            through all stages, their total size in bytes, and the elapsed seconds.
+        depths() -> dict[str, int]:
+            Returns the current depth of the queue in front of each stage.
+    """
+
+    network: threading.BoundedSemaphore
+    cpu: threading.BoundedSemaphore
+    order: str
+    max_inflight: int
+    queue_size: int
+    processes: int
+    converter: Optional[ProcessPoolExecutor] = None
+    stats: dict[str, dict]
+
+    _queues: dict[str, asyncio.Queue]
+
+    def __init__(
+        self,
+        net_workers: int = DOWNLOAD_NET_WORKERS,
+        cpu_workers: int = DOWNLOAD_CPU_WORKERS,
+        order: str = DOWNLOAD_ORDER,
+        max_inflight: int = DOWNLOAD_MAX_INFLIGHT,
+        queue_size: int = DOWNLOAD_QUEUE_SIZE,
+        processes: int = DOWNLOAD_PROCESSES,
+    ):
+        assert order in ORDERS, f"Order must be one of {ORDERS}"
+        assert min(net_workers, cpu_workers, queue_size) > 0, "Limits must be positive"
+        self.network = threading.BoundedSemaphore(net_workers)
+        self.cpu = threading.BoundedSemaphore(cpu_workers)
+        self.order = order
+        self.max_inflight = max_inflight
+        self.queue_size = queue_size
+        self.processes = processes
+        self.stats = {}
+        self._queues = {}
+
+    def _ordered(self, jobs: list[tuple]) -> list[tuple]:
+        if self.order == "largest":
+            return sorted(jobs, key=lambda job: job[0].size, reverse=True)
+        if self.order == "smallest":
+            return sorted(jobs, key=lambda job: job[0].size)
+        return jobs
+
+    def depths(self) -> dict[str, int]:
+        return {name: queue.qsize() for name, queue in self._queues.items()}
+
+    async def run(
+        self, jobs: list[tuple], stages: list[tuple[str, Callable, int]]
+    ) -> dict:
+
+        loop = asyncio.get_running_loop()
+        admission = asyncio.Condition()
+        inflight, admitted = 0, 0
+        result = {"objects": 0, "bytes": 0, "seconds": 0.0}
+        errors = []
+
+        names = [name for name, _, _ in stages]
+        queues = [asyncio.Queue(self.queue_size) for _ in stages]
+        self._queues = dict(zip(names, queues))
+        self.stats = {
+            name: {"objects": 0, "seconds": 0.0, "max_depth": 0} for name in names
+        }
+
+        async def put(k: int, job: tuple):
+            await queues[k].put(job)
+            stat = self.stats[names[k]]
+            stat["max_depth"] = max(stat["max_depth"], queues[k].qsize())
+
+        async def leave(job: tuple):
+            nonlocal inflight, admitted
+            async with admission:
+                admitted -= 1
+                inflight -= job[0].size
+                admission.notify_all()
+
+        async def worker(k: int, fn: Callable, executor: ThreadPoolExecutor):
+            stat = self.stats[names[k]]
+            while (job := await queues[k].get()) is not None:
+                if errors:  # drain
+                    await leave(job)
+                    continue
+                start = time.perf_counter()
+                try:
+                    # like asyncio.to_thread(), so e.g. nocache applies to workers
+                    context = contextvars.copy_context()
+                    await loop.run_in_executor(executor, context.run, fn, *job)
+                except Exception as e:
+                    errors.append(e)
+                    await leave(job)
+                    continue
+                finally:
+                    stat["seconds"] += time.perf_counter() - start
+                stat["objects"] += 1
+                if k + 1 < len(stages):
+                    await put(k + 1, job)
+                else:
+                    result["objects"] += 1
+                    result["bytes"] += job[0].size
+                    await leave(job)
+
+        if self.processes:
+            # forking a process with live threads may inherit held locks
+            method = "forkserver" if "forkserver" in _START_METHODS else "spawn"
+            self.converter = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context(method)
+            )
+
+        executors = [
+            ThreadPoolExecutor(n, thread_name_prefix=f"ipom-{name}")
+            for name, _, n in stages
+        ]
+        workers = [
+            [asyncio.create_task(worker(k, fn, executor)) for _ in range(n)]
+            for k, ((_, fn, n), executor) in enumerate(zip(stages, executors))
+        ]
+
+        start = time.perf_counter()
+        try:
+            for job in self._ordered(jobs):
+                size = job[0].size
+                async with admission:
+                    await admission.wait_for(
+                        lambda: errors
+                        or admitted == 0
+                        or inflight + size <= self.max_inflight
+                    )
+                    if errors:
+                        break
+                    admitted += 1
+                    inflight += size
+                await put(0, job)
+
+            # stop stages in order, after everything before them went through
+            for queue, tasks in zip(queues, workers):
+                for _ in tasks:
+                    await queue.put(None)
+                await asyncio.gather(*tasks)
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if self.converter is not None:
+                self.converter.shutdown(cancel_futures=True)
+                self.converter = None
+
+        result["seconds"] = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        return result
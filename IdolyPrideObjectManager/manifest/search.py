@@ -0,0 +1,209 @@
+"""
+search.py
+[INTERNAL] Trigram index over object names, narrowing regex searches.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# A requirement is what any matching name must contain, as a tree of
+# ("lit", str) | ("and", [requirement]) | ("or", [requirement]),
+# or None if nothing can be told from the pattern.
+Requirement = Optional[tuple]
+
+_REPEATS = {
+    sre_parse.MAX_REPEAT,
+    sre_parse.MIN_REPEAT,
+    getattr(sre_parse, "POSSESSIVE_REPEAT", sre_parse.MAX_REPEAT),
+}
+
+
+def _both(a: Requirement, b: Requirement) -> Requirement:
+    if a is None or b is None:
+        return a or b
+    return ("and", [a, b])
+
+
+def _requirement(pattern) -> Requirement:
+    """
+    Walks a parsed pattern, collecting runs of ASCII literals that must appear.
+    Only ASCII is considered, since case-insensitive matching folds
+    some non-ASCII characters (e.g. the Kelvin sign) into ASCII letters.
+    """
+
+    req, run = None, ""
+
+    def flush():
+        nonlocal req, run
+        if len(run) >= 3:
+            req = _both(req, ("lit", run.lower()))
+        run = ""
+
+    for op, av in pattern:
+        if op == sre_parse.LITERAL and av < 128:
+            run += chr(av)
+            continue
+        flush()
+        if op == sre_parse.SUBPATTERN:
+            req = _both(req, _requirement(av[-1]))
+        elif op == getattr(sre_parse, "ATOMIC_GROUP", None):
+            req = _both(req, _requirement(av))
+        elif op == sre_parse.ASSERT:  # lookaround, e.g. (?=.*word)
+            req = _both(req, _requirement(av[1]))
+        elif op in _REPEATS and av[0] >= 1:
+            req = _both(req, _requirement(av[2]))
+        elif op == sre_parse.BRANCH:
+            alternatives = [_requirement(alt) for alt in av[1]]
+            if all(alt is not None for alt in alternatives):
+                req = _both(req, ("or", alternatives))
+    flush()
+    return req
+
+
+@lru_cache(maxsize=256)
+def compile_criterion(criterion: str) -> tuple[re.Pattern, Requirement]:
+    """
+    Compiles a search criterion into a case-insensitive regex,
+    along with the literals any match must contain.
+    """
+    regex = re.compile(criterion, flags=re.IGNORECASE)
+    return regex, _requirement(sre_parse.parse(criterion, re.IGNORECASE))
+
+
+class PrideSearchIndex:
+    """
+    A trigram index over a list of names, in compressed sparse row layout:
+    postings of trigram codes[k] are rows[offsets[k]:offsets[k+1]].
+    Names with non-ASCII characters are not indexed and always kept as candidates.
+
+    Attributes:
+        names (list[str]): Names to be searched, matched against by row index.
+        name_order (np.ndarray): Row indices sorted by name case-insensitively,
+            close to the localeCompare() order the search page used to sort in,
+            built on first access.
+        name_ranks (np.ndarray): Position of each row in 'name_order'.
+
+    Methods:
+        search(criterion: str) -> list[int]:
+            Returns row indices of names matching the regex, in ascending order.
+        sort_by_name(rows: list[int]) -> np.ndarray:
+            Returns the rows sorted by name, in time linear to the number of names.
+    """
+
+    names: list[str]
+
+    _name_order: Optional[np.ndarray] = None
+    _name_ranks: Optional[np.ndarray] = None
+
+    _codes: np.ndarray
+    _offsets: np.ndarray
+    _rows: np.ndarray
+    _unindexed: np.ndarray
+
+    def __init__(self, names: list[str]):
+        self.names = names
+
+        blob = "\0".join(names).lower().encode("utf-8")
+        buf = np.frombuffer(blob, dtype=np.uint8)
+        ascii_ = np.fromiter(map(str.isascii, names), dtype=bool, count=len(names))
+        self._unindexed = np.flatnonzero(~ascii_)
+
+        if len(buf) < 3 or not ascii_.any():
+            self._codes = self._rows = np.empty(0, dtype=np.int64)
+            self._offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        row = np.cumsum(buf == 0)  # separators themselves are dropped below
+        codes = (
+            buf[:-2].astype(np.int64) << 16
+            | buf[1:-1].astype(np.int64) << 8
+            | buf[2:].astype(np.int64)
+        )
+        keep = (buf[:-2] != 0) & (buf[1:-1] != 0) & (buf[2:] != 0)
+        keep &= ascii_[row[:-2]] & (row[:-2] == row[2:])
+        pairs = np.sort(codes[keep] << 24 | row[:-2][keep])  # by code, then row
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])]
+
+        codes, self._rows = pairs >> 24, pairs & 0xFFFFFF
+        starts = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+        self._codes = codes[starts]
+        self._offsets = np.append(starts, len(pairs))
+
+    def _postings(self, trigram: str) -> np.ndarray:
+        b = trigram.encode("ascii")
+        code = b[0] << 16 | b[1] << 8 | b[2]
+        k = np.searchsorted(self._codes, code)
+        if k == len(self._codes) or self._codes[k] != code:
+            return np.empty(0, dtype=np.int64)
+        return self._rows[self._offsets[k] : self._offsets[k + 1]]
+
+    def _candidates(self, req: Requirement) -> Optional[np.ndarray]:
+        if req is None:
+            return None
+        kind, arg = req
+        if kind == "lit":
+            rows = None
+            for i in range(len(arg) - 2):
+                postings = self._postings(arg[i : i + 3])
+                rows = (
+                    postings
+                    if rows is None
+                    else np.intersect1d(rows, postings, assume_unique=True)
+                )
+            return rows
+        parts = [self._candidates(r) for r in arg]
+        if kind == "and":
+            parts = [p for p in parts if p is not None]
+            if not parts:
+                return None
+            rows = parts[0]
+            for p in parts[1:]:
+                rows = np.intersect1d(rows, p, assume_unique=True)
+            return rows
+        if any(p is None for p in parts):  # "or"
+            return None
+        return np.unique(np.concatenate(parts))
+
+    @property
+    def name_order(self) -> np.ndarray:
+        if self._name_order is None:
+            names = self.names
+            self._name_order = np.array(
+                sorted(
+                    range(len(names)), key=lambda i: (names[i].casefold(), names[i])
+                ),
+                dtype=np.int64,
+            )
+        return self._name_order
+
+    @property
+    def name_ranks(self) -> np.ndarray:
+        if self._name_ranks is None:
+            ranks = np.empty(len(self.names), dtype=np.int64)
+            ranks[self.name_order] = np.arange(len(ranks))
+            self._name_ranks = ranks
+        return self._name_ranks
+
+    def sort_by_name(self, rows: list[int]) -> np.ndarray:
+        # mark the ranks of the rows, then read them off in order; no comparisons
+        hit = np.zeros(len(self.names), dtype=bool)
+        hit[self.name_ranks[np.asarray(rows, dtype=np.int64)]] = True
+        return self.name_order[np.flatnonzero(hit)]
+
+    def search(self, criterion: str) -> list[int]:
+        regex, req = compile_criterion(criterion)
+        rows = self._candidates(req)
+        if rows is None:
+            rows = range(len(self.names))
+        else:
+            rows = np.union1d(rows, self._unindexed).tolist()
+        names = self.names
+        return [i for i in rows if regex.match(names[i]) is not None]
@@ -0,0 +1,255 @@
+"""
+snapshot.py
+[INTERNAL] Binary, memory-mappable on-disk cache of parsed manifests.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+from hashlib import blake2b
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from ..const import (
+    DEFAULT_CACHE_PATH,
+    SNAPSHOT_KEEP,
+    SNAPSHOT_MAGIC,
+    SNAPSHOT_VERSION,
+    PathArgtype,
+)
+from ..object import PrideAssetBundle, PrideResource
+from ..rich import Logger
+from ..utils import atomic_open
+from .columns import FIELDS, PrideObjectColumns, PrideStringColumn
+from .listing import PrideObjectList
+from .manifest import PrideManifest
+from .revision import PrideManifestRevision
+
+logger = Logger()
+
+# Layout of a snapshot file:
+#   magic (8 bytes) | version (uint32) | header length (uint32) | header (JSON)
+#   | padding | array | padding | array | ...
+# Every array starts on an ALIGNMENT boundary, so that np.frombuffer()
+# can map it straight out of the file without copying.
+PREFIX = struct.Struct("<8sII")
+ALIGNMENT = 64
+
+LISTS = [
+    ("assetBundleList", "assetbundles", PrideAssetBundle),
+    ("resourceList", "resources", PrideResource),
+]
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def source_key(source: bytes, base_revision: int = 0) -> str:
+    """
+    Digests the bytes a manifest is parsed from, together with the base revision
+    it was loaded with, into a snapshot cache key.
+    """
+    h = blake2b(source, digest_size=16)
+    h.update(f"|{base_revision}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def dump_snapshot(manifest: PrideManifest, path: PathArgtype, key: str = ""):
+    """
+    Writes the column stores of a manifest, including their name orders
+    and fingerprints, into a snapshot file.
+    """
+
+    header = {
+        "key": key,
+        "revision": manifest.revision.canon_repr,
+        "urlFormat": manifest.urlformat,
+        "lists": {},
+    }
+    arrays = []
+    size = 0
+
+    def add(specs: dict, name: str, array: np.ndarray):
+        nonlocal size
+        array = np.ascontiguousarray(array)
+        size = _align(size)
+        specs[name] = (size, array.dtype.str, len(array))
+        arrays.append((size, array))
+        size += array.nbytes
+
+    for jkey, attr, _ in LISTS:
+        columns: PrideObjectColumns = getattr(manifest, attr).columns
+        specs = {}
+        add(specs, "mask", columns.mask)
+        for field, kind, _ in FIELDS:
+            column = columns.columns[field]
+            if kind == "str":
+                if not isinstance(column, PrideStringColumn):
+                    column = PrideStringColumn.from_strings(column)
+                add(specs, f"{field}.blob", column.blob)
+                add(specs, f"{field}.offsets", column.offsets)
+            else:
+                add(specs, field, column)
+                if kind == "list":
+                    add(specs, f"{field}.offsets", columns.offsets[field])
+        add(specs, "name_order", columns.name_order)
+        add(specs, "fingerprints", columns.fingerprints)
+        header["lists"][jkey] = {
+            "length": len(columns),
+            "arrays": specs,
+            "extras": {str(i): extra for i, extra in columns.extras.items()},
+        }
+
+    header = json.dumps(header).encode("utf-8")
+    start = _align(PREFIX.size + len(header))
+
+    with atomic_open(path, "wb") as f:
+        f.write(PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for offset, array in arrays:
+            f.write(b"\0" * (start + offset - f.tell()))
+            f.write(array.data)
+
+
+def load_snapshot(path: PathArgtype) -> PrideManifest:
+    """
+    Maps a snapshot file into memory and wraps it as a manifest.
+    Arrays are views into the mapping, so pages are only read on access.
+    """
+
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = PREFIX.unpack_from(buf, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"Not a v{SNAPSHOT_VERSION} manifest snapshot")
+    header = json.loads(buf[PREFIX.size : PREFIX.size + header_len])
+    start = _align(PREFIX.size + header_len)
+
+    def array(spec: list) -> np.ndarray:
+        offset, dtype, count = spec
+        if not count:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(buf, dtype=dtype, count=count, offset=start + offset)
+
+    lists = {}
+    for jkey, _, base_class in LISTS:
+        specs = header["lists"][jkey]["arrays"]
+        columns, offsets = {}, {}
+        for field, kind, _ in FIELDS:
+            if kind == "str":
+                columns[field] = PrideStringColumn(
+                    array(specs[f"{field}.blob"]), array(specs[f"{field}.offsets"])
+                )
+            else:
+                columns[field] = array(specs[field])
+                if kind == "list":
+                    offsets[field] = array(specs[f"{field}.offsets"])
+
+        extras = header["lists"][jkey]["extras"]
+        store = PrideObjectColumns(
+            array(specs["mask"]),
+            columns,
+            offsets,
+            {int(i): extra for i, extra in extras.items()},
+        )
+        store._name_order = array(specs["name_order"])
+        store._fingerprints = array(specs["fingerprints"])
+        lists[jkey] = PrideObjectList(store, base_class, header["urlFormat"])
+
+    revision = header["revision"]
+    if isinstance(revision, int):
+        revision = (revision, 0)
+
+    return PrideManifest(
+        {  # same as in PrideManifest.__sub__, skips type conversion
+            "revision": PrideManifestRevision(*revision),
+            **lists,
+            "urlFormat": header["urlFormat"],
+        }
+    )
+
+
+class PrideSnapshotCache:
+    """
+    A directory of manifest snapshots, keyed by source_key() of the bytes
+    they were parsed from, and named after their revision for readability.
+    Only the SNAPSHOT_KEEP most recently used snapshots are retained.
+
+    Attributes:
+        root (Path): Directory holding the snapshots.
+
+    Methods:
+        get(key: str) -> Optional[PrideManifest]:
+            Opens the snapshot of the given key, if cached.
+        put(key: str, manifest: PrideManifest) -> None:
+            Caches a manifest under the given key.
+        get_latest(base_revision: int, max_age: float) -> Optional[PrideManifest]:
+            Opens the latest fetched snapshot of the given base revision,
+            if it was fetched no longer than 'max_age' seconds ago.
+        set_latest(base_revision: int, key: str) -> None:
+            Records the key of the latest fetched snapshot of the given base revision.
+        manifests() -> Iterator[PrideManifest]:
+            Opens all retained snapshots, skipping unreadable ones.
+    """
+
+    root: Path
+
+    def __init__(self, root: PathArgtype = DEFAULT_CACHE_PATH / "manifests"):
+        self.root = Path(root)
+
+    def get(self, key: str) -> Optional[PrideManifest]:
+        for path in self.root.glob(f"*.{key}.snap"):
+            try:
+                manifest = load_snapshot(path)
+                os.utime(path)  # mark as recently used
+                return manifest
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Discarding unreadable snapshot {path.name}: {e}")
+                path.unlink(missing_ok=True)
+        return None
+
+    def put(self, key: str, manifest: PrideManifest):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            dump_snapshot(manifest, self.root / f"{manifest.revision}.{key}.snap", key)
+            self._prune()
+        except OSError as e:  # caching is best-effort
+            logger.warning(f"Failed to cache manifest snapshot: {e}")
+
+    def get_latest(self, base_revision: int, max_age: float) -> Optional[PrideManifest]:
+        pointer = self.root / f"latest-v{base_revision:04}"
+        try:
+            if time.time() - pointer.stat().st_mtime > max_age:
+                return None
+            key = pointer.read_text().strip()
+        except OSError:
+            return None
+        return self.get(key)
+
+    def set_latest(self, base_revision: int, key: str):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with atomic_open(self.root / f"latest-v{base_revision:04}", "w") as f:
+                f.write(key)
+        except OSError as e:
+            logger.warning(f"Failed to record latest manifest snapshot: {e}")
+
+    def manifests(self) -> Iterator[PrideManifest]:
+        for path in sorted(self.root.glob("*.snap")):
+            try:
+                yield load_snapshot(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable snapshot {path.name}: {e}")
+
+    def _prune(self):
+        snapshots = sorted(
+            self.root.glob("*.snap"), key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for path in snapshots[SNAPSHOT_KEEP:]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,152 @@
+"""
+sync.py
+[INTERNAL] Sidecar index of downloaded outputs, for keeping a mirror current.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Union
+
+from ..const import DEFAULT_DOWNLOAD_PATH, SYNC_INDEX_NAME, PathArgtype
+from ..object import PrideAssetBundle, PrideResource
+from ..rich import Logger
+from ..utils import atomic_open
+
+ObjectClass = Union[PrideAssetBundle, PrideResource]
+
+logger = Logger()
+
+# download kwargs that don't affect the content of the outputs
+_TRANSIENT_KWARGS = {
+    "path",
+    "categorize",
+    "progress",
+    "task_id",
+    "upstream",
+    "force_overwrite",
+    "scheduler",
+}
+
+
+class PrideSyncIndex:
+    """
+    A JSON sidecar at 'root/SYNC_INDEX_NAME' recording, for each download target
+    (the path an object is exported to), the MD5, generation, and export options
+    of the object, along with the size and mtime of every file written.
+    A target is current if all of these still match, so outputs are never re-hashed.
+
+    Attributes:
+        root (Path): Directory the targets are relative to.
+        prune (bool): Whether to delete outputs that no longer match,
+            i.e. superseded by a re-download, or of targets not synced this run.
+        entries (dict[str, dict]): Target -> its record.
+
+    Methods:
+        target(obj: ObjectClass, kwargs: dict) -> str:
+            Returns the target of an object downloaded with the given kwargs.
+        is_current(target: str, obj: ObjectClass, kwargs: dict) -> bool:
+            Whether the recorded outputs of the target are still those
+            of the object with the given kwargs, and untouched on disk.
+        record(target: str, obj: ObjectClass, kwargs: dict, outputs: list[Path]) -> None:
+            Records the outputs of a finished download.
+        finish(synced: Iterable[str]) -> None:
+            Prunes targets not in 'synced' if enabled, and saves the index.
+    """
+
+    root: Path
+    prune: bool
+    entries: dict[str, dict]
+
+    def __init__(self, root: PathArgtype = DEFAULT_DOWNLOAD_PATH, prune: bool = False):
+
+        self.root = Path(root)
+        self.prune = prune
+        self.entries = {}
+
+        try:
+            with open(self.root / SYNC_INDEX_NAME, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)["entries"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable sync index: {e}")
+
+    def _relative(self, path: PathArgtype) -> str:
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def target(self, obj: ObjectClass, kwargs: dict) -> str:
+        path = obj._download_path(
+            kwargs.get("path", DEFAULT_DOWNLOAD_PATH), kwargs.get("categorize", True)
+        )
+        return self._relative(path)
+
+    @staticmethod
+    def _options(kwargs: dict) -> str:
+        options = {k: v for k, v in kwargs.items() if k not in _TRANSIENT_KWARGS}
+        return json.dumps(options, sort_keys=True, default=str)
+
+    def is_current(self, target: str, obj: ObjectClass, kwargs: dict) -> bool:
+
+        entry = self.entries.get(target)
+        if (
+            entry is None
+            or entry["md5"] != obj.md5
+            or entry["generation"] != str(obj.generation)
+            or entry["options"] != self._options(kwargs)
+            or not entry["outputs"]
+        ):
+            return False
+
+        for output in entry["outputs"]:
+            try:
+                stat = (self.root / output["path"]).stat()
+            except OSError:
+                return False
+            if stat.st_size != output["size"] or stat.st_mtime_ns != output["mtime_ns"]:
+                return False
+
+        return True
+
+    def record(self, target: str, obj: ObjectClass, kwargs: dict, outputs: list[Path]):
+
+        records = []
+        for path in outputs:
+            stat = path.stat()
+            records.append(
+                {
+                    "path": self._relative(path),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+            )
+
+        old = self.entries.get(target)
+        self.entries[target] = {
+            "md5": obj.md5,
+            "generation": str(obj.generation),
+            "options": self._options(kwargs),
+            "outputs": records,
+        }
+
+        if self.prune and old is not None:
+            written = {r["path"] for r in records}
+            self._delete(o["path"] for o in old["outputs"] if o["path"] not in written)
+
+    def finish(self, synced: Iterable[str]):
+
+        if self.prune:
+            synced = set(synced)
+            stale = [t for t in self.entries if t not in synced]
+            for target in stale:
+                self._delete(o["path"] for o in self.entries.pop(target)["outputs"])
+            if stale:
+                logger.info(f"Pruned outputs of {len(stale)} targets no longer synced")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.root / SYNC_INDEX_NAME, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f)
+
+    def _delete(self, paths: Iterable[str]):
+        for path in paths:
+            (self.root / path).unlink(missing_ok=True)
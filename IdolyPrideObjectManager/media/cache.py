@@ -0,0 +1,311 @@
+"""
+media/cache.py
+Byte-budgeted caches of media payloads, in memory (raw and converted)
+and on disk (converted, persisting across processes).
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import blake2b
+from pathlib import Path
+from typing import Hashable, Optional
+
+from ..const import (
+    CONVERSION_CACHE_BUDGET,
+    DEFAULT_CONVERSION_CACHE_PATH,
+    MEDIA_CACHE_BUDGET,
+    PathArgtype,
+)
+from ..utils import atomic_open
+
+# set by bypass(), per thread or asyncio task, and inherited by download workers
+_bypassed: ContextVar[bool] = ContextVar("bypassed", default=False)
+
+
+class PrideMediaCache:
+    """
+    A thread-safe LRU cache of media payloads, shared by all PrideDummyMedia instances.
+    Entries are tuples whose size is given on insertion (i.e. that of the payload),
+    and least recently used ones are evicted once their total exceeds the budget.
+    Payloads larger than the budget are not cached at all.
+
+    Attributes:
+        budget (int): Maximum total size in bytes of the cached payloads.
+        size (int): Current total size in bytes of the cached payloads.
+        hits (int): Number of lookups that found an entry.
+        misses (int): Number of lookups that didn't.
+        evictions (int): Number of entries evicted to stay within budget.
+
+    Methods:
+        get(key: Hashable) -> Optional[tuple]:
+            Returns the entry of the given key, marking it as recently used.
+        put(key: Hashable, entry: tuple, size: int) -> None:
+            Caches an entry of the given size, unless bypassed (see bypass()).
+        configure(budget: int) -> None:
+            Changes the budget, evicting entries as necessary.
+        clear() -> None:
+            Drops all entries. Counters are kept.
+        bypass() -> ContextManager:
+            Disables insertion within the context, e.g. for bulk downloads,
+            which would otherwise flush the entries of interactive use.
+            Lookups still hit existing entries.
+        stats() -> dict:
+            Returns the counters along with the number of entries and their size.
+    """
+
+    budget: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    _entries: OrderedDict  # key -> (entry, size), least recently used first
+    _lock: threading.Lock
+
+    def __init__(self, budget: int = MEDIA_CACHE_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries  # doesn't count as a lookup
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, entry: tuple, size: int):
+        if _bypassed.get() or size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (entry, size)
+            self.size += size
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.budget:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+
+    def configure(self, budget: int):
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    @contextmanager
+    def bypass(self):
+        token = _bypassed.set(True)
+        try:
+            yield
+        finally:
+            _bypassed.reset(token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class PrideConversionCache:
+    """
+    A directory of converted payloads, at 'root/ab/abcdef...' by a digest of their key,
+    so that repeated conversions (across restarts, presets, and revisions
+    where the MD5 is unchanged) become plain file reads.
+    Each file holds a JSON header line, with the key, the converted format,
+    and the mtime of the media, followed by the payload.
+    Hits refresh the mtime of the file, and least recently used files
+    are evicted once their total size exceeds the budget.
+    Files are replaced atomically, so the directory may be shared between processes,
+    although each of them only accounts for the size of its own writes until rescanning.
+
+    Attributes:
+        root (Path): Directory holding the payloads.
+        budget (int): Maximum total size in bytes of the files, 0 to disable.
+        hits (int): Number of lookups that found a file.
+        misses (int): Number of lookups that didn't.
+        evictions (int): Number of files evicted to stay within budget.
+
+    Methods:
+        path(key: Hashable) -> Path:
+            Returns the file path of the given key, whether present or not.
+        get(key: Hashable) -> Optional[tuple]:
+            Returns the (converted, converted_format, mtime) entry of the given key.
+        locate(key: Hashable) -> Optional[tuple[Path, int, dict]]:
+            Returns the file of the given key, the offset of its payload,
+            and its header, e.g. to stream the payload instead of reading it.
+        put(key: Hashable, entry: tuple, size: int) -> None:
+            Writes a (converted, converted_format, mtime) entry of the given size.
+        clear() -> None:
+            Deletes all files. Counters are kept.
+        stats() -> dict:
+            Returns the counters along with the number of files and their size.
+    """
+
+    root: Path
+    budget: int
+    hits: int
+    misses: int
+    evictions: int
+
+    _size: Optional[int] = None  # scanned on first write
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        root: PathArgtype = DEFAULT_CONVERSION_CACHE_PATH,
+        budget: int = CONVERSION_CACHE_BUDGET,
+    ):
+        self.root = Path(root)
+        self.budget = budget
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _name(key: Hashable) -> str:
+        return repr(key)  # keys are tuples of strings, numbers, and None
+
+    def path(self, key: Hashable) -> Path:
+        digest = blake2b(self._name(key).encode("utf-8"), digest_size=16).hexdigest()
+        return self.root / digest[:2] / digest
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.budget > 0 and self.path(key).exists()
+
+    def locate(self, key: Hashable) -> Optional[tuple[Path, int, dict]]:
+
+        if self.budget <= 0:
+            return None
+
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                if header["key"] != self._name(key):  # digest collision
+                    raise KeyError(key)
+                offset = f.tell()
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return path, offset, header
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+
+        located = self.locate(key)
+        if located is None:
+            return None
+
+        path, offset, header = located
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                converted = f.read()
+        except OSError:  # evicted just now
+            return None
+
+        return converted, header["format"], header["mtime"]
+
+    def put(self, key: Hashable, entry: tuple, size: int):
+
+        if size > self.budget:
+            return
+
+        converted, converted_format, mtime = entry
+        header = {"key": self._name(key), "format": converted_format, "mtime": mtime}
+        path = self.path(key)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size in self._files())
+            try:
+                self._size -= path.stat().st_size
+            except OSError:
+                pass
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_open(path, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(converted)
+            self._size += path.stat().st_size
+
+            if self._size > self.budget:
+                self._evict()
+
+    def _files(self) -> list[tuple[Path, int]]:
+        files = []
+        for path in self.root.glob("??/*"):
+            if path.name.startswith("."):  # being written by atomic_open()
+                continue
+            try:
+                files.append((path, path.stat()))
+            except OSError:
+                continue  # evicted by another process
+        files.sort(key=lambda file: file[1].st_mtime)
+        return [(path, stat.st_size) for path, stat in files]
+
+    def _evict(self):
+        files = self._files()  # least recently used first
+        self._size = sum(
+            size for _, size in files
+        )  # also catch up with other processes
+        for path, size in files:
+            if self._size <= self.budget:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for path, _ in self._files():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._files()
+        return {
+            "entries": len(files),
+            "size": sum(size for _, size in files),
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# shared by all media instances
+cache = PrideMediaCache()
+conversions = PrideConversionCache()
@@ -5,12 +5,17 @@ Serves as a base class & template for other media plugins,
 as well as a fallback for unknown media types.
 """
 
+import copy
 import os
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Callable, Optional, Tuple, Union
+from typing import Callable, ContextManager, Hashable, Iterator, Optional, Tuple, Union
 from zipfile import ZipFile
 
+from ..const import STREAM_CHUNK
 from ..rich import ProgressReporter
+from ..utils import atomic_open, iter_file
+from .cache import cache, conversions
 
 
 class PrideDummyMedia:
@@ -20,7 +25,13 @@ class PrideDummyMedia:
     Attributes:
         ext (str): File extension of the media file.
         downloader (Callable): Function to lazily download raw bytes.
+        streamer (Callable, optional): Function to download raw bytes straight into a file,
+            used for rawdumps unless raw bytes are already in memory.
+        ranger (Callable, optional): Function returning the size, mtime, and a generator
+            of ranges of raw bytes, used for streaming unless they are already in memory.
         reporter (ProgressReporter): Reporter for download progress.
+        key (Hashable, optional): Identity of the raw bytes in the shared media cache
+            (see cache.py), e.g. MD5 and name. Payloads are not cached if None.
         mtime (float): Last modified time of the media file as a timestamp.
         mimetype (str): Media type (e.g., "image", "audio", "video").
         raw (bytes): Raw binary data of the media file.
@@ -32,19 +43,21 @@ class PrideDummyMedia:
     Methods:
         get_data(**kwargs) -> dict:
             Requests data of the desired format.
-        export(path: Path, **kwargs):
-            Exports the media to the specified path.
+        get_stream(**kwargs) -> dict:
+            Requests data of the desired format as a stream of chunks.
+        export(path: Path, **kwargs) -> list[Path]:
+            Exports the media to the specified path, returning the files written.
     """
 
-    ENABLE_CACHE: bool = True
+    ENABLE_OFFLOAD: bool = True  # whether _convert() may run in a worker process
 
     ext: str
     mtime: float = 0.0
     downloader: Callable[[], dict]
+    streamer: Optional[Callable[[Path], dict]] = None
+    ranger: Optional[Callable[[], dict]] = None
     reporter: ProgressReporter
-
-    _raw: Optional[bytes] = None
-    _converted: Optional[bytes] = None
+    key: Optional[Hashable] = None
 
     # Children should override raw_format if raw bytes is "ready"
     #   or converted_format as the default target, but **not both.**
@@ -70,10 +83,16 @@ class PrideDummyMedia:
         ext: str,
         downloader: Callable[[], dict],
         reporter: ProgressReporter,
+        streamer: Optional[Callable[[Path], dict]] = None,
+        ranger: Optional[Callable[[], dict]] = None,
+        key: Optional[Hashable] = None,
     ):
         self.ext = ext.lower()
         self.downloader = downloader  # lazy downloader
+        self.streamer = streamer
+        self.ranger = ranger
         self.reporter = reporter
+        self.key = key
         self._init_mimetype()
 
     def _init_mimetype(self):
@@ -100,50 +119,116 @@ class PrideDummyMedia:
             dict: A dictionary of keys "bytes", "mimetype", and "mtime".
         """
 
-        fmt = kwargs.get(
-            f"{self.mimetype}_format",
-            self.raw_format
-            or self.default_converted_format,  # fallback if raw_format is empty
-        ).lower()
+        fmt = self._requested_format(**kwargs)
 
         if self.raw_format == fmt:  # rawdump
             _bytes = self.raw  # must be called before accessing self.mtime
             return {
                 "bytes": _bytes,
-                "mimetype": (
-                    f"{self.mimetype}/{self.raw_format}"
-                    if self.mimetype and self.raw_format
-                    else "application/octet-stream"
-                ),
+                "mimetype": self._raw_mimetype(),
                 "mtime": self.mtime,
             }
 
-        image_resize = kwargs.get("image_resize", None)
-        if (
-            self.converted_format != fmt or image_resize != self.image_resize
-        ):  # record and convert
-            self.converted_format = fmt
-            self._converted = None  # invalidate cache
-            self.image_resize = image_resize
-
+        self._record(fmt, kwargs.get("image_resize", None))
         _bytes = self.converted
         return {
             "bytes": _bytes,
-            "mimetype": (
-                "application/zip"
-                if _bytes.startswith(b"PK\x03\x04")
-                # a bit of a hack, but we don't want to override bookkeeping vars
-                else (
-                    f"{self.mimetype}/{self.converted_format}"
-                    if self.mimetype and self.converted_format
-                    else "application/octet-stream"
-                    # in case some malicious user escaped the 'if self.raw_format == fmt' branch
-                    # by explicitly specifying '_format' as some random value
+            "mimetype": self._converted_mimetype(_bytes),
+            "mtime": self.mtime,
+        }
+
+    def get_stream(self, **kwargs) -> dict:
+        """
+        Requests data of the desired format as a stream of chunks, taking the
+        same arguments as get_data(). Raw bytes are streamed through the ranger
+        (e.g. as they download), and converted bytes from the conversion cache on disk,
+        so that neither is held in memory as a whole. Otherwise, chunks are sliced
+        from the bytes in memory.
+
+        Returns:
+            dict: A dictionary of keys "size", "mimetype", "mtime",
+                and "chunks", a function yielding the bytes in [start, stop).
+        """
+
+        fmt = self._requested_format(**kwargs)
+
+        if self.raw_format == fmt:  # rawdump
+            if self.ranger is not None and self._cache_key("raw") not in cache:
+                stream = self.ranger()
+                self.mtime = stream["mtime"]
+                return {**stream, "mimetype": self._raw_mimetype()}
+            return _sliced(self.get_data(**kwargs))
+
+        self._record(fmt, kwargs.get("image_resize", None))
+        key = self._converted_key()
+        if key is None or key in cache:
+            return _sliced(self.get_data(**kwargs))
+
+        located = conversions.locate(key)
+        if located is None:
+            converted = self.converted  # cached on disk if it fits
+            located = conversions.locate(key)
+            if located is None:  # too large to cache, serve what was just converted
+                return _sliced(
+                    {
+                        "bytes": converted,
+                        "mimetype": self._converted_mimetype(converted),
+                        "mtime": self.mtime,
+                    }
                 )
-            ),
+
+        path, offset, header = located
+        self.converted_format, self.mtime = header["format"], header["mtime"]
+        size = path.stat().st_size - offset
+        magic = b"".join(
+            iter_file(path, offset, offset + 4)
+        )  # see _converted_mimetype()
+
+        def chunks(start: int, stop: int) -> Iterator[bytes]:
+            return iter_file(path, offset + start, offset + stop, STREAM_CHUNK)
+
+        return {
+            "size": size,
+            "mimetype": self._converted_mimetype(magic),
             "mtime": self.mtime,
+            "chunks": chunks,
         }
 
+    def _requested_format(self, **kwargs) -> str:
+        return kwargs.get(
+            f"{self.mimetype}_format",
+            self.raw_format
+            or self.default_converted_format,  # fallback if raw_format is empty
+        ).lower()
+
+    def _record(self, fmt: str, image_resize: Optional[Union[str, Tuple[int, int]]]):
+        if (
+            self.converted_format != fmt or image_resize != self.image_resize
+        ):  # record and convert, the cache key follows
+            self.converted_format = fmt
+            self.image_resize = image_resize
+
+    def _raw_mimetype(self) -> str:
+        return (
+            f"{self.mimetype}/{self.raw_format}"
+            if self.mimetype and self.raw_format
+            else "application/octet-stream"
+        )
+
+    def _converted_mimetype(self, _bytes: bytes) -> str:
+        return (
+            "application/zip"
+            if _bytes.startswith(b"PK\x03\x04")
+            # a bit of a hack, but we don't want to override bookkeeping vars
+            else (
+                f"{self.mimetype}/{self.converted_format}"
+                if self.mimetype and self.converted_format
+                else "application/octet-stream"
+                # in case some malicious user escaped the 'if self.raw_format == fmt' branch
+                # by explicitly specifying '_format' as some random value
+            )
+        )
+
     def _get_predicted_mimesubtype(self, **kwargs) -> str:
         # This is exclusively used for early return in _export_converted(),
         #   to avoid true mimesubtype's dependency on raw bytes.
@@ -163,28 +248,78 @@ class PrideDummyMedia:
         ).lower()
         return fmt if (fmt and self.mimetype) else self.ext
 
+    def _cache_key(self, *parts: Hashable) -> Optional[tuple]:
+        """
+        [INTERNAL] Key of a payload of this media in the shared cache, None if uncached.
+        """
+        return None if self.key is None else (self.key, *parts)
+
     @property
     def raw(self) -> bytes:
-        if self._raw is not None:
-            return self._raw  # read from cache
+        key = self._cache_key("raw")
+        entry = None if key is None else cache.get(key)
+        if entry is not None:
+            data, self.mtime = entry  # read from cache
+            return data
         data = self.downloader()
-        self.mtime = data["mtime"]  # unconditionally cache, as a metadata field
-        if self.ENABLE_CACHE:
-            self._raw = data["bytes"]
+        self.mtime = data["mtime"]  # unconditionally kept, as a metadata field
+        if key is not None:
+            cache.put(key, (data["bytes"], self.mtime), len(data["bytes"]))
         return data["bytes"]  # cached or not, this is "valid"
 
+    def _converted_key(self) -> Optional[tuple]:
+        # converted_format is requested here, and may be changed by conversion
+        return self._cache_key(
+            type(self).__name__, self.converted_format, self.image_resize
+        )
+
     @property
     def converted(self) -> bytes:
-        if self._converted is not None:
-            return self._converted  # assumes proper invalidation beforehand
+        key = self._converted_key()
+        entry = None if key is None else cache.get(key)
+        if entry is None and key is not None:
+            entry = conversions.get(key)  # converted before, perhaps by another process
+            if entry is not None:
+                cache.put(key, entry, len(entry[0]))
+        if entry is not None:
+            converted, self.converted_format, self.mtime = entry
+            return converted
         raw = self.raw
-        self.reporter.update("Converting")
-        converted = self._convert(raw)
-        if self.ENABLE_CACHE:
-            self._converted = converted
+        with self.reporter.limit("cpu"):
+            self.reporter.update("Converting")
+            converter = getattr(self.reporter.scheduler, "converter", None)
+            if converter is not None and self.ENABLE_OFFLOAD:
+                converted = self._convert_offloaded(converter, raw)
+            else:
+                converted = self._convert(raw)
+        if key is not None:
+            entry = (converted, self.converted_format, self.mtime)
+            cache.put(key, entry, len(converted))
+            conversions.put(key, entry, len(converted))  # regardless of nocache
+        return converted
+
+    def _convert_offloaded(self, converter, raw: bytes) -> bytes:
+        """
+        [INTERNAL] Runs _convert() on a detached copy of self in a worker process
+        (see PrideScheduler), then replays its bookkeeping and reporter messages here.
+        """
+
+        clone = copy.copy(self)
+        clone.downloader = clone.streamer = clone.ranger = None  # bound to the object
+        clone.reporter = _DetachedReporter()
+
+        converted, converted_format, messages, error = converter.submit(
+            _convert_detached, clone, raw
+        ).result()
+
+        self.converted_format = converted_format  # e.g. PNG fallback in PrideImage
+        for status, message in messages:
+            getattr(self.reporter, status)(message)  # error() raises
+        if error is not None:
+            raise error
         return converted
 
-    def export(self, path: Path, **kwargs):
+    def export(self, path: Path, **kwargs) -> list[Path]:
         """
         Exports the media to the specified path.
 
@@ -192,56 +327,114 @@ class PrideDummyMedia:
             path (Path): The path to export the media to.
             convert_{mimetype} (bool): Whether to enable media conversion.
             {mimetype}_format (str): Desired format for the media type.
+            force_overwrite (bool) = False: Whether to overwrite existing files
+                instead of aborting.
+
+        Returns:
+            list[Path]: Files written, empty if aborted.
         """
 
+        force_overwrite = kwargs.get("force_overwrite", False)
+
         # not overriding self.mimetype indicates unhandled media type
         if self.mimetype and kwargs.get(f"convert_{self.mimetype}", True):
             try:
-                self._export_converted(path, **kwargs)
+                return self._export_converted(path, **kwargs)
             except Exception as e:
                 self.reporter.warning(
                     "Conversion failed, fallback to rawdump; exception to follow"
                 )
-                self._export_raw(path)
+                self._export_raw(path, force_overwrite)
                 raise e
         else:
-            self._export_raw(path)
+            return self._export_raw(path, force_overwrite)
 
-    def _export_raw(self, path: Path):
+    def _exists(self, path: Path, **kwargs) -> bool:
+        """
+        [INTERNAL] Whether export() would abort since the output exists,
+        mirroring the checks in _export_raw() and _export_converted().
+        """
 
-        if path.exists():
-            self.reporter.warning("Already exists, aborting")
-            return
+        if kwargs.get("force_overwrite", False):
+            return False
+        if self.mimetype and kwargs.get(f"convert_{self.mimetype}", True):
+            _mimesubtype = self._get_predicted_mimesubtype(**kwargs)
+            return path.with_suffix(f".{_mimesubtype}").exists() or (
+                self.ext == "acb" and path.with_suffix(".zip").exists()
+            )
+        return path.exists()
 
-        self.reporter.start()
+    def _cached(self, **kwargs) -> bool:
+        """
+        [INTERNAL] Whether export() would convert, and find the result in either cache,
+        so that the raw bytes are not needed. Mirrors get_data().
+        """
 
-        path.write_bytes(self.raw)
-        if self.mtime:
-            os.utime(path, (self.mtime, self.mtime))
+        if not (self.mimetype and kwargs.get(f"convert_{self.mimetype}", True)):
+            return False
+        fmt = self._requested_format(**kwargs)
+        if self.raw_format == fmt:  # rawdump
+            return False
+        key = self._cache_key(type(self).__name__, fmt, kwargs.get("image_resize"))
+        return key is not None and (key in cache or key in conversions)
+
+    def _export_raw(self, path: Path, force_overwrite: bool = False) -> list[Path]:
+
+        if path.exists() and not force_overwrite:
+            self.reporter.warning("Already exists, aborting")
+            return []
 
+        self.reporter.start()
+        self._write_raw(path)
         self.reporter.success("Downloaded and rawdumped")
+        return [path]
+
+    def _write_raw(self, path: Path):
+        # Stream to disk unless the bytes are already here;
+        # the full buffer is only built when conversion needs it.
+        # The streamer sets the mtime itself, as its file may be hardlinked to the store.
+        if self.streamer is not None and self._cache_key("raw") not in cache:
+            self.mtime = self.streamer(path)["mtime"]
+        else:
+            with atomic_open(path, "wb") as f:
+                f.write(self.raw)
+            if self.mtime:
+                os.utime(path, (self.mtime, self.mtime))
+
+    def _export_converted(self, path: Path, **kwargs) -> list[Path]:
 
-    def _export_converted(self, path: Path, **kwargs):
+        force_overwrite = kwargs.get("force_overwrite", False)
 
         # underscored vars are for early return and log only
         _mimesubtype = self._get_predicted_mimesubtype(**kwargs)
         _path = path.with_suffix(f".{_mimesubtype}")
-        if _path.exists():
+        if _path.exists() and not force_overwrite:
             self.reporter.warning(f"*.{_mimesubtype} already exists, aborting")
-            return
+            return []
 
         # additional check for existing .zip; yet the unpacked case is still uncovered
-        if self.ext == "acb" and path.with_suffix(".zip").exists():
+        if (
+            self.ext == "acb"
+            and path.with_suffix(".zip").exists()
+            and not force_overwrite
+        ):
             self.reporter.warning("*.zip already exists, aborting")
-            return
+            return []
 
         self.reporter.start()
 
+        # rawdump in disguise, see get_data()
+        if self.raw_format and self.raw_format == _mimesubtype:
+            self._write_raw(_path)
+            self.reporter.success(f"Downloaded and rawdumped as {_mimesubtype.upper()}")
+            return [_path]
+
         data = self.get_data(**kwargs)
         mimesubtype = data["mimetype"].split("/")[1]
         path = path.with_suffix(f".{mimesubtype}")  # true mimesubtype
 
-        path.write_bytes(data["bytes"])
+        with atomic_open(path, "wb") as f:  # never writes through an existing hardlink
+            f.write(data["bytes"])
         if self.mtime:
             os.utime(path, (self.mtime, self.mtime))
 
@@ -250,9 +443,65 @@ class PrideDummyMedia:
             self.reporter.update("Unpacking")
             with ZipFile(path) as z:
                 z.extractall(path.parent)  # surprisingly, doesn't keep mtime's
-                for file in z.namelist():
-                    os.utime(path.parent / file, (self.mtime, self.mtime))
+                unpacked = [path.parent / file for file in z.namelist()]
+                for file in unpacked:
+                    os.utime(file, (self.mtime, self.mtime))
             path.unlink()
             self.reporter.success(f"Downloaded and unpacked to {path.parent}")
+            return unpacked
         else:
             self.reporter.success(f"Downloaded and converted to {mimesubtype.upper()}")
+            return [path]
+
+
+def _sliced(data: dict) -> dict:
+    """
+    [INTERNAL] Turns the result of get_data() into that of get_stream().
+    """
+    view = memoryview(data["bytes"])
+    return {
+        "size": len(view),
+        "mimetype": data["mimetype"],
+        "mtime": data["mtime"],
+        "chunks": lambda start, stop: (
+            view[i : min(i + STREAM_CHUNK, stop)].tobytes()
+            for i in range(start, stop, STREAM_CHUNK)
+        ),
+    }
+
+
+class _DetachedReporter:
+    """
+    [INTERNAL] Stand-in for ProgressReporter in worker processes,
+    recording messages to be replayed by the real one.
+    """
+
+    scheduler = None
+
+    def __init__(self):
+        self.messages = []
+
+    def update(self, stage: str, advance: Optional[int] = None):
+        pass
+
+    def limit(self, stage: str) -> ContextManager:
+        return nullcontext()
+
+    def warning(self, message: str):
+        self.messages.append(("warning", message))
+
+    def error(self, message: str):
+        self.messages.append(("error", message))
+        raise RuntimeError(message)
+
+
+def _convert_detached(media: PrideDummyMedia, raw: bytes) -> tuple:
+    """
+    [INTERNAL] Worker process entry of PrideDummyMedia._convert_offloaded().
+    Exceptions are returned rather than raised, along with the messages before them.
+    """
+    try:
+        converted, error = media._convert(raw), None
+    except Exception as e:
+        converted, error = None, e
+    return converted, media.converted_format, media.reporter.messages, error
@@ -13,6 +13,8 @@ from .dummy import PrideDummyMedia
 class PrideVideo(PrideDummyMedia):
     """Handler for videos of common formats recognized by FFmpeg."""
 
+    ENABLE_OFFLOAD = False  # FFmpeg runs in a subprocess already
+
     def _init_mimetype(self):
         self.mimetype = "video"
         self.raw_format = self.ext
@@ -43,8 +45,8 @@ class PrideVideo(PrideDummyMedia):
 class PrideUnityVideo(PrideVideo):
     """Conversion plugin for Unity video."""
 
-    def __init__(self, name: str, raw: bytes, mtime: int):
-        super().__init__(name, raw, mtime)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.raw_format = None  # don't override
         self.default_converted_format = "mp4"
 
@@ -0,0 +1,103 @@
+"""
+network.py
+Shared HTTP connection pool for manifest requests and object downloads.
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .const import HTTP_POOL_BLOCK, HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST
+
+
+class PrideConnectionPool:
+    """
+    A thread-safe pool of keep-alive HTTP connections.
+    Each thread gets its own requests.Session (sessions are not thread-safe),
+    but all of them mount the same adapter, whose connection pools are.
+
+    Attributes:
+        hosts (int): Number of hosts to keep connection pools for.
+        per_host (int): Number of keep-alive connections retained per host.
+        block (bool): Whether to wait for an idle connection once 'per_host'
+            connections to a host are in use, instead of opening extra
+            (non-retained) ones, i.e. whether 'per_host' is a hard limit.
+
+    Methods:
+        configure(
+            hosts: Optional[int] = None,
+            per_host: Optional[int] = None,
+            block: Optional[bool] = None,
+        ) -> None:
+            Replaces the pool with one of the given settings, keeping unspecified ones.
+            Connections of the old pool are closed, or dropped after use if busy.
+        get(url: str, **kwargs) -> requests.Response:
+            Sends a GET request through the pool, see requests.get().
+    """
+
+    hosts: int
+    per_host: int
+    block: bool
+
+    _adapter: HTTPAdapter
+    _generation: int
+    _local: threading.local
+
+    def __init__(
+        self,
+        hosts: int = HTTP_POOL_HOSTS,
+        per_host: int = HTTP_POOL_PER_HOST,
+        block: bool = HTTP_POOL_BLOCK,
+    ):
+        self.hosts = hosts
+        self.per_host = per_host
+        self.block = block
+        self._adapter = self._new_adapter()
+        self._generation = 0
+        self._local = threading.local()
+
+    def _new_adapter(self) -> HTTPAdapter:
+        return HTTPAdapter(
+            pool_connections=self.hosts,
+            pool_maxsize=self.per_host,
+            pool_block=self.block,
+        )
+
+    def configure(
+        self,
+        hosts: Optional[int] = None,
+        per_host: Optional[int] = None,
+        block: Optional[bool] = None,
+    ):
+        if hosts is not None:
+            self.hosts = hosts
+        if per_host is not None:
+            self.per_host = per_host
+        if block is not None:
+            self.block = block
+
+        old, self._adapter = self._adapter, self._new_adapter()
+        self._generation += 1  # sessions of all threads remount lazily
+        old.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The requests.Session of the calling thread, mounted on the shared adapter.
+        """
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.session = requests.Session()
+            local.session.mount("https://", self._adapter)
+            local.session.mount("http://", self._adapter)
+            local.generation = self._generation
+        return local.session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session.get(url, **kwargs)
+
+
+# shared by fetch() and all object downloads
+pool = PrideConnectionPool()
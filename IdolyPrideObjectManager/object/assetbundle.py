@@ -27,11 +27,13 @@ class PrideAssetBundle(PrideResource):
             path: Union[str, Path] = DEFAULT_DOWNLOAD_PATH,
             categorize: bool = True,
             **kwargs,
-        ) -> None:
+        ) -> list[Path]:
             Downloads and deobfuscates the assetbundle to the specified path.
             Also extracts a single image from each bundle with type 'img'.
     """
 
+    _head_len = 256  # PrideAssetBundleDeobfuscator.header_len
+
     def __init__(self, info: dict, url_template: str):
         """
         Initializes an assetbundle with the given information.
@@ -80,24 +82,20 @@ class PrideAssetBundle(PrideResource):
         else:
             return PrideDummyMedia
 
-    def _download_bytes(self) -> dict:
+    def _process_head(self, buf: bytearray) -> bool:
         """
-        [INTERNAL] Downloads, and optionally deobfuscates, the assetbundle as raw bytes.
+        [INTERNAL] Deobfuscates the assetbundle header in place if necessary.
+        Only the header is obfuscated, so the rest of the buffer is left untouched.
         Sanity checks are implemented in parent class PrideResource.
         """
 
-        data = super()._download_bytes()
-        _bytes, _mtime = data["bytes"], data["mtime"]
-
-        if not _bytes.startswith(UNITY_SIGNATURE):
-            self._reporter.update("Deobfuscating")
-            _bytes = PrideAssetBundleDeobfuscator(self.name).process(_bytes)
-            if not _bytes.startswith(UNITY_SIGNATURE):
-                self._reporter.warning("Downloaded but LEFT OBFUSCATED")
-                # Unexpected things may happen...
-                # So unlike _download_bytes(), here we don't raise an error and abort.
+        if buf.startswith(UNITY_SIGNATURE):
+            return False
 
-        return {
-            "bytes": _bytes,
-            "mtime": _mtime,
-        }
+        self._reporter.update("Deobfuscating")
+        PrideAssetBundleDeobfuscator(self.name).process_into(buf)
+        if not buf.startswith(UNITY_SIGNATURE):
+            self._reporter.warning("Downloaded but LEFT OBFUSCATED")
+            # Unexpected things may happen...
+            # So unlike sanity checks, here we don't raise an error and abort.
+        return True
@@ -3,12 +3,25 @@ obfuscate.py
 [INTERNAL] PrideAssetBundle deobfuscator.
 """
 
+from functools import lru_cache
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+from ..const import DEOBFUSCATE_MASK_CACHE
+
+Buffer = Union[bytearray, memoryview]
+
 
 class PrideAssetBundleDeobfuscator:
     """
     Assetbundle deobfuscator for PRIDE.
     Algorithm courtesy of github.com/MalitsPlus.
     ('maskString' is refactored to 'key' and 'maskBytes' to 'mask'.)
+    Only the first 'header_len' bytes of the stream are obfuscated, each XOR'ed
+    with the mask repeated from the start of the stream, so the whole header
+    is unmasked with a single vectorized XOR against a precomputed keystream.
+    Masks and keystreams are cached per key, since bundles share instances of neither.
 
     Attributes:
         mask (bytes): Obfuscation mask.
@@ -19,6 +32,12 @@ class PrideAssetBundleDeobfuscator:
     Methods:
         process(enc: bytes) -> bytes:
             Deobfuscates the given obfuscated bytes into plaintext.
+            Only the header is copied besides the returned bytes.
+        process_into(buf: Union[bytearray, memoryview]) -> int:
+            Deobfuscates a writable buffer in place. Returns the number of bytes unmasked.
+        process_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+            Deobfuscates a stream of chunks as they arrive, advancing 'stream_pos'.
+            Chunks past the header are passed through untouched.
     """
 
     offset: int
@@ -26,6 +45,8 @@ class PrideAssetBundleDeobfuscator:
     header_len: int
     mask: bytes
 
+    _keystream: np.ndarray
+
     def __init__(
         self,
         key: str,
@@ -47,8 +68,10 @@ class PrideAssetBundleDeobfuscator:
         self.stream_pos = stream_pos
         self.header_len = header_len
         self.mask = self._make_mask(key.replace(".unity3d", ""))
+        self._keystream = self._make_keystream(self.mask, header_len)
 
     @staticmethod
+    @lru_cache(maxsize=DEOBFUSCATE_MASK_CACHE)
     def _make_mask(key: str) -> bytes:
         """
         [INTERNAL] Generates an obfuscation mask from the given key.
@@ -69,6 +92,24 @@ class PrideAssetBundleDeobfuscator:
 
         return bytes([b ^ x for b in mask])
 
+    @staticmethod
+    @lru_cache(maxsize=DEOBFUSCATE_MASK_CACHE)
+    def _make_keystream(mask: bytes, header_len: int) -> np.ndarray:
+        """
+        [INTERNAL] Repeats the mask over the header, i.e. keystream[i] = mask[i % len(mask)].
+        The returned array is read-only, since it is shared between instances.
+        """
+
+        keystream = np.resize(np.frombuffer(mask, dtype=np.uint8), header_len)
+        keystream.setflags(write=False)
+        return keystream
+
+    def _span(self, available: int) -> int:
+        """
+        [INTERNAL] Number of bytes to unmask from 'offset', given the bytes available there.
+        """
+        return max(0, min(self.header_len - self.stream_pos, available))
+
     def process(self, enc: bytes) -> bytes:
         """
         Deobfuscates the given obfuscated bytes into plaintext.
@@ -77,14 +118,42 @@ class PrideAssetBundleDeobfuscator:
             enc (bytes): The obfuscated bytes to deobfuscate.
         """
 
-        buf = bytearray(enc)
+        end = self.offset + self._span(len(enc) - self.offset)
+        head = bytearray(enc[:end])
+        self.process_into(head)
+        return b"".join((head, memoryview(enc)[end:]))
+
+    def process_into(self, buf: Buffer) -> int:
+        """
+        Deobfuscates the given buffer in place, e.g. a download buffer.
+
+        Args:
+            buf (Union[bytearray, memoryview]): A writable buffer of obfuscated bytes.
+        """
 
-        i = 0
-        masksize = len(self.mask)
-        while self.stream_pos + i < self.header_len:
-            buf[self.offset + i] ^= self.mask[
-                self.stream_pos + i - int((self.stream_pos + i) / masksize) * masksize
-            ]
-            i += 1
+        n = self._span(len(buf) - self.offset)
+        if n:
+            view = np.frombuffer(buf, dtype=np.uint8, count=n, offset=self.offset)
+            start = self.stream_pos
+            np.bitwise_xor(view, self._keystream[start : start + n], out=view)
+        return n
+
+    def process_stream(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Deobfuscates chunks of an obfuscated stream as they arrive.
+        Only the chunks overlapping the header are copied.
+
+        Args:
+            chunks (Iterable[bytes]): Consecutive chunks of the stream,
+                the first one starting at 'stream_pos'.
+        """
 
-        return bytes(buf)
+        offset, self.offset = self.offset, 0
+        try:
+            for chunk in chunks:
+                if self.stream_pos < self.header_len:
+                    chunk = self.process(chunk)
+                self.stream_pos += len(chunk)
+                yield chunk
+        finally:
+            self.offset = offset
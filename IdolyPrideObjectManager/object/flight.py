@@ -0,0 +1,66 @@
+"""
+flight.py
+[INTERNAL] Coalescing of concurrent requests for the same object data.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+from ..utils import RefCountedRegistry
+
+
+class PrideSingleFlight:
+    """
+    Runs at most one computation per (subject, params) at a time.
+    Callers arriving while one is in flight wait for it and share its result
+    (or exception) instead of repeating it. Computations of different params
+    on the same subject, e.g. two formats of one object, run one at a time,
+    since media keep the requested conversion as instance state.
+
+    Attributes:
+        coalesced (int): Number of calls that shared an in-flight computation.
+
+    Methods:
+        do(subject: Hashable, params: Hashable, fn: Callable[[], T]) -> T:
+            Returns fn(), or the result of the same computation in flight.
+    """
+
+    coalesced: int
+
+    _inflight: dict[tuple, Future]
+    _locks: RefCountedRegistry  # held while a computation on the subject runs
+    _lock: threading.Lock
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight = {}
+        self._locks = RefCountedRegistry(threading.Lock)
+        self._lock = threading.Lock()
+
+    def do(self, subject: Hashable, params: Hashable, fn: Callable):
+
+        key = (subject, params)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                with self._locks.hold(subject) as lock, lock:
+                    future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]  # later calls start afresh
+
+        return future.result()
+
+
+# shared by all object data requests
+flights = PrideSingleFlight()
@@ -3,19 +3,33 @@ resource.py
 General-purpose resource downloading.
 """
 
+import json
+import os
 import re
 from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 
-import requests
+from cryptography.hazmat.primitives import hashes
 
 from ..adv import PrideAdventure
-from ..const import CHARACTER_ABBREVS, DEFAULT_DOWNLOAD_PATH, PathArgtype
+from ..const import (
+    CHARACTER_ABBREVS,
+    DEFAULT_DOWNLOAD_PATH,
+    RESUME_CHECKPOINT,
+    STREAM_CHUNK,
+    PathArgtype,
+)
 from ..media import PrideDummyMedia
 from ..media.video import PrideVideo
+from ..network import pool
 from ..rich import ProgressReporter
-from ..utils import md5sum
+from ..utils import atomic_open, iter_file, md5hasher
+from .flight import flights
+from .store import store
+
+# get_data() kwargs that only concern progress reporting, see ProgressReporter.register()
+_REPORTER_KWARGS = {"progress", "task_id", "upstream", "scheduler"}
 
 
 class PrideResource:
@@ -36,8 +50,8 @@ class PrideResource:
             path: Union[str, Path] = DEFAULT_DOWNLOAD_PATH,
             categorize: bool = True,
             **kwargs,
-        ) -> None:
-            Downloads the resource to the specified path.
+        ) -> list[Path]:
+            Downloads the resource to the specified path, returning the files written.
     """
 
     id: int
@@ -47,6 +61,7 @@ class PrideResource:
     md5: str
 
     _fields: list[str]
+    _head_len: int = 0  # see _process_head()
     _idname: str
     _url: str
     _media: Optional[PrideDummyMedia] = None
@@ -111,6 +126,9 @@ class PrideResource:
                 self.name.split(".")[-1],  # use extension as raw format
                 self._download_bytes,
                 self._reporter,
+                streamer=self._download_file,
+                ranger=self._stream_raw,
+                key=(self.md5, self.name),  # AB bytes depend on the name too
             )
 
         return self._media
@@ -127,15 +145,43 @@ class PrideResource:
         Returns:
             dict: A dictionary of keys "bytes", "mimetype", and "mtime".
         """
-        self._reporter.register(**kwargs)
-        return self.media.get_data(**kwargs)
+        return self._coalesced("get_data", **kwargs)
+
+    def get_stream(self, **kwargs) -> dict:
+        """
+        Requests object data like get_data(), but as a stream of chunks,
+        so that large media can be served in ranges without being held in memory.
+
+        Returns:
+            dict: A dictionary of keys "size", "mimetype", "mtime",
+                and "chunks", a function yielding the bytes in [start, stop).
+        """
+        return self._coalesced("get_stream", **kwargs)
+
+    def _coalesced(self, method: str, **kwargs) -> dict:
+        """
+        [INTERNAL] Calls a media method, sharing the result with concurrent calls
+        of the same conversion params (see flight.py). Only the first caller registers
+        the reporter, so progress goes to its upstream; the server passes the same
+        broadcast upstream for every request of an object anyway.
+        """
+
+        params = repr(
+            sorted(kv for kv in kwargs.items() if kv[0] not in _REPORTER_KWARGS)
+        )
+
+        def call() -> dict:
+            self._reporter.register(**kwargs)
+            return getattr(self.media, method)(**kwargs)
+
+        return flights.do((self.md5, self.name), (method, params), call)
 
     def download(
         self,
         path: PathArgtype = DEFAULT_DOWNLOAD_PATH,
         categorize: bool = True,
         **kwargs,
-    ):
+    ) -> list[Path]:
         """
         Downloads the resource to the specified path.
 
@@ -144,11 +190,35 @@ class PrideResource:
                 If a directory, subdirectories are auto-determined based on the resource name.
             categorize (bool) = True: Whether to put the downloaded object into subdirectories.
                 If False, the object is directly downloaded to the specified 'path'.
+
+        Returns:
+            list[Path]: Files written, empty if the target already exists.
         """
 
         self._reporter.register(**kwargs)
         path = self._download_path(path, categorize)
-        self.media.export(path, **kwargs)
+        return self.media.export(path, **kwargs)
+
+    def _prefetch(
+        self,
+        path: PathArgtype = DEFAULT_DOWNLOAD_PATH,
+        categorize: bool = True,
+        **kwargs,
+    ):
+        """
+        [INTERNAL] Fetches the resource into the object store ahead of download(),
+        which takes the same arguments, unless the output already exists
+        or its conversion is cached. Used by the fetch stage of PrideScheduler.
+        """
+
+        self._reporter.register(**kwargs)
+        media = self.media
+        if not (
+            media._exists(self._download_path(path, categorize), **kwargs)
+            or media._cached(**kwargs)
+        ):
+            self._reporter.start()
+            self._fetch_blob()
 
     def _download_path(self, path: PathArgtype, categorize: bool) -> Path:
         """
@@ -196,39 +266,313 @@ class PrideResource:
 
         return Path(*filename.split("_"))
 
-    def _download_bytes(self) -> dict:
+    def _process_head(self, buf: bytearray) -> bool:
         """
-        [INTERNAL] Downloads the resource from the server and performs sanity checks
-        on HTTP status code, size, and MD5 hash. Returns the resource as raw bytes.
+        [INTERNAL] Post-processes in place the first '_head_len' bytes of a verified
+        download, given a buffer starting with them. Returns whether anything changed.
+        No-op for resources, see PrideAssetBundle.
         """
+        return False
 
-        with requests.get(self._url, timeout=10, stream=True) as response:
-            response.raise_for_status()
-
-            chunks = []
+    def _iter_download(
+        self, offset: int = 0, digest: Optional[hashes.Hash] = None
+    ) -> Iterator[bytes]:
+        """
+        [INTERNAL] Streams the resource from the server, hashing and counting bytes
+        as they arrive, and performs sanity checks on HTTP status code, size,
+        and MD5 hash once exhausted. Consumers must exhaust it before trusting the data.
 
-            for chunk in response.iter_content(chunk_size=8192):
-                if not chunk:
-                    continue
-                chunks.append(chunk)
-                self._reporter.update("Downloading", advance=len(chunk))
+        Args:
+            offset (int) = 0: Number of bytes already at hand; the rest is
+                requested with a Range header.
+            digest (hashes.Hash, optional): MD5 context fed with the bytes at hand.
+                Required if 'offset' is nonzero. Updated in place.
+        """
 
-            content = b"".join(chunks)
+        digest = digest or md5hasher()
+        _size = offset
+
+        if offset < self.size:  # otherwise the server would reply 416
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            with pool.get(
+                self._url, headers=headers, timeout=10, stream=True
+            ) as response:
+                response.raise_for_status()
+                skip = offset if response.status_code != 206 else 0  # Range ignored
+
+                for chunk in response.iter_content(chunk_size=8192):
+                    if skip:
+                        chunk, skip = chunk[skip:], max(skip - len(chunk), 0)
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    _size += len(chunk)
+                    self._reporter.update("Downloading", advance=len(chunk))
+                    yield chunk
 
         # We're being strict here by aborting the download process
         # if any of the sanity checks fail, in order to avoid corrupted output.
         # The client can always retry; just ignore the "file already exists" warnings.
         # Note: Returning empty bytes is unnecessary, since _reporter.error() raises an exception.
 
-        _size = len(content)
         if _size != self.size:
             self._reporter.error(f"Invalid size: expected {self.size}, got {_size}")
 
-        _md5 = md5sum(content).hex()
+        _md5 = digest.finalize().hex()
         if _md5 != self.md5:
             self._reporter.error(f"Invalid MD5 hash: expected {self.md5}, got {_md5}")
 
+    def _download_part(self, part: Path):
+        """
+        [INTERNAL] Downloads the resource into a '.part' file, resuming from
+        where a previous attempt left off. Progress is journaled into a sidecar
+        '.part.json' every RESUME_CHECKPOINT bytes, recording the offset and
+        the MD5 of everything before it. Both are removed if the download
+        completes but fails sanity checks, and the sidecar is removed on success.
+        """
+        for _ in self._iter_part(part):
+            pass
+
+    def _iter_part(self, part: Path) -> Iterator[Tuple[int, bytes]]:
+        """
+        [INTERNAL] Generator behind _download_part(), yielding first the offset resumed
+        from with empty bytes, then each chunk with its offset once written to the file.
+        If closed early, the '.part' remains resumable from its last checkpoint.
+        """
+
+        journal = part.with_name(part.name + ".json")
+        offset, digest = self._resume_part(part, journal)
+
+        try:
+            with open(part, "r+b" if offset else "wb") as f:
+                f.truncate(offset)
+                f.seek(offset)
+                yield offset, b""
+                checkpoint = offset + RESUME_CHECKPOINT
+                for chunk in self._iter_download(offset, digest):
+                    f.write(chunk)
+                    yield offset, chunk
+                    offset += len(chunk)
+                    if offset >= checkpoint and offset < self.size:
+                        f.flush()
+                        os.fsync(f.fileno())  # data must be durable before the journal
+                        with atomic_open(journal, "w") as j:
+                            json.dump(
+                                {
+                                    "md5": self.md5,
+                                    "size": self.size,
+                                    "offset": offset,
+                                    "digest": digest.copy().finalize().hex(),
+                                },
+                                j,
+                            )
+                        checkpoint = offset + RESUME_CHECKPOINT
+                f.flush()
+                os.fsync(f.fileno())
+        except RuntimeError:  # failed sanity checks, don't resume from garbage
+            part.unlink(missing_ok=True)
+            journal.unlink(missing_ok=True)
+            raise
+
+        journal.unlink(missing_ok=True)
+
+    def _resume_part(self, part: Path, journal: Path) -> Tuple[int, hashes.Hash]:
+        """
+        [INTERNAL] Validates a journaled '.part' file against this resource,
+        re-hashing its journaled prefix. Returns the offset to resume from
+        and the MD5 context of the bytes before it, or zero and a fresh context.
+        """
+
+        digest = md5hasher()
+        try:
+            state = json.loads(journal.read_text())
+            if state["md5"] != self.md5 or state["size"] != self.size:
+                raise ValueError("Journal belongs to another revision")
+            offset = state["offset"]
+            with open(part, "rb") as f:
+                remaining = offset
+                while remaining:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        raise ValueError("Partial file shorter than journaled")
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+            if digest.copy().finalize().hex() != state["digest"]:
+                raise ValueError("Partial file does not match journaled digest")
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, md5hasher()
+
+        self._reporter.update("Resuming", advance=offset)
+        return offset, digest
+
+    def _fetch_blob(self) -> Path:
+        """
+        [INTERNAL] Ensures the resource is in the object store (see store.py),
+        downloading it if no revision has done so before. Returns the blob path.
+        """
+
+        blob = store.path(self.md5)
+        with store.lock(self.md5):
+            if store.has(self.md5, self.size):
+                self._reporter.update("Reusing", advance=self.size)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                part = blob.with_name(blob.name + ".part")
+                with self._reporter.limit("network"):
+                    self._download_part(part)
+                self._store_part(part, blob)
+        return blob
+
+    def _stream_raw(self) -> dict:
+        """
+        [INTERNAL] Returns the size, mtime, and chunk generator of the raw bytes,
+        see _iter_raw(). Nothing is downloaded until the generator is iterated.
+        """
+        return {
+            "size": self.size,
+            "mtime": int(self.generation) / 1e6,
+            "chunks": self._iter_raw,
+        }
+
+    def _iter_raw(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        """
+        [INTERNAL] Yields the bytes in [start, stop) of the resource as downloaded,
+        i.e. with its head processed, from the object store. If it's not there yet
+        and no other thread is fetching it, the download is teed into the store,
+        so the first bytes are yielded as soon as they arrive. Closing the generator
+        early leaves a resumable '.part' behind, see _iter_part().
+        """
+
+        stop = self.size if stop is None else min(stop, self.size)
+        first = 0 if start < self._head_len else start  # the head is processed whole
+
+        if not store.has(self.md5, self.size):
+            with store.lock(self.md5, blocking=False) as locked:
+                if locked and not store.has(self.md5, self.size):
+                    pieces = self._tee_blob(first)
+                    try:
+                        yield from self._slice(pieces, start, stop)
+                        if stop == self.size:
+                            for _ in pieces:  # runs sanity checks, and stores the blob
+                                pass
+                        return
+                    finally:
+                        pieces.close()  # before another thread may take over the '.part'
+
+        pieces = _iter_file(self._fetch_blob(), first)
+        try:
+            yield from self._slice(pieces, start, stop)
+        finally:
+            pieces.close()
+
+    def _tee_blob(self, first: int) -> Iterator[Tuple[int, bytes]]:
+        """
+        [INTERNAL] Downloads the resource into the object store, like _fetch_blob()
+        whose lock must be held, yielding chunks with their offsets from 'first' on,
+        including those of a resumed '.part'.
+        """
+
+        blob = store.path(self.md5)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        part = blob.with_name(blob.name + ".part")
+
+        pieces = self._iter_part(part)
+        resumed, _ = next(pieces)
+        if first < resumed:
+            yield from _iter_file(part, first, resumed)
+        for offset, chunk in pieces:
+            if offset + len(chunk) > first:
+                yield offset, chunk
+        self._store_part(part, blob)
+
+    def _store_part(self, part: Path, blob: Path):
+        """
+        [INTERNAL] Moves a complete download into the object store, stamped with
+        the modification time of the resource so that outputs can be hardlinked to it.
+        """
+
+        mtime = int(self.generation) / 1e6
+        os.utime(part, (mtime, mtime))
+        os.replace(part, blob)
+
+    def _slice(
+        self, pieces: Iterator[Tuple[int, bytes]], start: int, stop: int
+    ) -> Iterator[bytes]:
+        """
+        [INTERNAL] Trims consecutive chunks, given with their offsets, to [start, stop).
+        Chunks within the head, which then must start from 0, are gathered and processed.
+        """
+
+        head = bytearray()
+        head_len = min(self._head_len, self.size)
+
+        for offset, chunk in pieces:
+            if offset < head_len:
+                head += chunk
+                if len(head) < head_len:
+                    continue
+                self._process_head(head)
+                offset, chunk = 0, head
+            lo, hi = max(start - offset, 0), min(stop - offset, len(chunk))
+            if lo < hi:
+                yield bytes(chunk[lo:hi]) if (lo, hi) != (0, len(chunk)) else chunk
+            if offset + len(chunk) >= stop:
+                break
+
+    def _download_bytes(self) -> dict:
+        """
+        [INTERNAL] Downloads the resource from the server as raw bytes,
+        through the object store. If the head may need processing,
+        the bytes are read into a bytearray and processed in place.
+        """
+
+        blob = self._fetch_blob()
+
+        if self._head_len:  # read into a mutable buffer, patched in place
+            content = bytearray(self.size)
+            view = memoryview(content)
+            with open(blob, "rb", buffering=0) as f:
+                read = 0
+                while read < len(content) and (n := f.readinto(view[read:])):
+                    read += n
+            self._process_head(content)
+        else:
+            content = blob.read_bytes()
+
         return {
             "bytes": content,
             "mtime": int(self.generation) / 1e6,
         }
+
+    def _download_file(self, path: Path) -> dict:
+        """
+        [INTERNAL] Downloads the resource from the server straight into a file,
+        without holding it in memory. The file is materialized from the object store,
+        so only objects new to the store are transferred.
+        """
+
+        blob = self._fetch_blob()
+
+        new_head = b""
+        if self._head_len:
+            with open(blob, "rb") as f:
+                head = bytearray(f.read(self._head_len))
+            if self._process_head(head):  # otherwise nothing to patch, allows hardlinks
+                new_head = bytes(head)
+
+        mtime = int(self.generation) / 1e6
+        store.materialize(self.md5, path, head=new_head, mtime=mtime)
+        return {
+            "mtime": mtime,
+        }
+
+
+def _iter_file(
+    path: Path, start: int = 0, stop: Optional[int] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    [INTERNAL] Yields chunks of a file in [start, stop) along with their offsets.
+    """
+    for chunk in iter_file(path, start, stop, STREAM_CHUNK):
+        yield start, chunk
+        start += len(chunk)
@@ -0,0 +1,153 @@
+"""
+store.py
+Content-addressed local object store, shared across revisions and output trees.
+"""
+
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import ContextManager, Iterable, Optional, Tuple
+
+from ..const import DEFAULT_STORE_PATH, STORE_LINK_MODES, PathArgtype
+from ..utils import RefCountedRegistry
+
+_FICLONE = 0x40049409  # linux/fs.h, copy-on-write clone of a whole file
+
+
+class PrideObjectStore:
+    """
+    A directory of verified objects, keyed by the MD5 of their bytes as served,
+    at 'root/ab/abcdef...'. Every download passes through the store,
+    and output trees are materialized from it, so an object is only transferred
+    once no matter how many revisions, presets, or layouts it appears in.
+    Interrupted downloads are kept as '.part' files next to their blobs.
+
+    Attributes:
+        root (Path): Directory holding the blobs.
+        link_modes (tuple[str, ...]): Materialization strategies, tried in order.
+            Any of 'reflink' (copy-on-write clone), 'hardlink', and 'copy'.
+            Hardlinked outputs share the blob, so editing them in place corrupts it,
+            and they share its mtime too, so they're only made when it's already right.
+
+    Methods:
+        path(md5: str) -> Path:
+            Returns the blob path of the given MD5, whether present or not.
+        has(md5: str, size: int) -> bool:
+            Whether the blob of the given MD5 is present and of the given size.
+        lock(md5: str, blocking: bool = True) -> ContextManager[bool]:
+            Holds the lock of the blob of the given MD5 while it's being written,
+            yielding whether it was acquired, i.e. always if blocking.
+        materialize(md5: str, dest: Path, head: bytes = b"", mtime: Optional[float] = None) -> None:
+            Atomically places the blob of the given MD5 at 'dest',
+            with its first len(head) bytes replaced by 'head' if given,
+            and its modification time set to 'mtime' if given.
+        gc(retained: Iterable[str], dry_run: bool = False) -> Tuple[int, int]:
+            Removes blobs and partial downloads whose MD5 is not in 'retained'.
+            Returns the number of files and bytes freed.
+    """
+
+    root: Path
+    link_modes: tuple[str, ...]
+
+    _locks: RefCountedRegistry
+
+    def __init__(
+        self,
+        root: PathArgtype = DEFAULT_STORE_PATH,
+        link_modes: tuple[str, ...] = STORE_LINK_MODES,
+    ):
+        self.root = Path(root)
+        self.link_modes = link_modes
+        self._locks = RefCountedRegistry(threading.Lock)
+
+    def path(self, md5: str) -> Path:
+        return self.root / md5[:2] / md5
+
+    def has(self, md5: str, size: int) -> bool:
+        try:
+            return self.path(md5).stat().st_size == size
+        except OSError:
+            return False
+
+    @contextmanager
+    def lock(self, md5: str, blocking: bool = True) -> ContextManager[bool]:
+        with self._locks.hold(md5) as lock:
+            acquired = lock.acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    lock.release()
+
+    def materialize(
+        self, md5: str, dest: Path, head: bytes = b"", mtime: Optional[float] = None
+    ):
+
+        src = self.path(md5)
+        # a hardlink can't have an mtime of its own, setting it would alter the blob
+        shared = not head and (mtime is None or src.stat().st_mtime == mtime)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            for mode in self.link_modes:
+                if mode == "hardlink" and not shared:
+                    continue  # the head or mtime would be written to the blob
+                tmp.unlink(missing_ok=True)
+                try:
+                    if mode == "reflink":
+                        _reflink(src, tmp)
+                    elif mode == "hardlink":
+                        os.link(src, tmp)
+                    else:
+                        shutil.copyfile(src, tmp)
+                    break
+                except OSError:
+                    continue  # e.g. unsupported filesystem, or across devices
+            else:
+                raise OSError(f"Failed to materialize {md5} with {self.link_modes}")
+
+            if head:
+                with open(tmp, "r+b") as f:
+                    f.write(head)
+            if mtime is not None and not os.path.samefile(src, tmp):
+                os.utime(tmp, (mtime, mtime))
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def gc(self, retained: Iterable[str], dry_run: bool = False) -> Tuple[int, int]:
+
+        retained = set(retained)
+        count, size = 0, 0
+
+        for path in self.root.glob("??/*"):
+            md5 = path.name.split(".")[0]  # also matches '.part' and '.part.json'
+            if md5 in retained:
+                continue
+            count += 1
+            size += path.stat().st_size
+            if not dry_run:
+                path.unlink(missing_ok=True)
+
+        return count, size
+
+
+def _reflink(src: Path, dst: Path):
+    """
+    [INTERNAL] Clones 'src' into 'dst' sharing extents (Btrfs, XFS, etc.).
+    Raises OSError where unsupported.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("Reflinks are not supported on this platform")
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+
+# shared by all object downloads
+store = PrideObjectStore()
@@ -3,8 +3,10 @@ rich.py
 Rich console logger and progress reporter.
 """
 
+import threading
+from contextlib import nullcontext
 from queue import Queue
-from typing import Optional
+from typing import ContextManager, Optional
 
 from rich.console import Console
 from rich.progress import BarColumn, Progress, TextColumn, TimeElapsedColumn
@@ -39,6 +41,47 @@ class Logger(Console):
         raise RuntimeError(message)
 
 
+class ProgressBroadcast:
+    """
+    A stand-in for the upstream queue of ProgressReporter that copies every update
+    to each subscribed queue, e.g. one per GUI client following the same object.
+    A new subscriber first receives the latest progress update, if still in progress.
+
+    Methods:
+        subscribe(queue: Queue[dict]) -> None:
+            Starts copying updates to the queue.
+        unsubscribe(queue: Queue[dict]) -> None:
+            Stops copying updates to the queue.
+        put(item: dict) -> None:
+            Copies the update to every subscribed queue.
+    """
+
+    _queues: list[Queue]
+    _latest: Optional[dict] = None
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._queues = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, queue: Queue):
+        with self._lock:
+            self._queues.append(queue)
+            if self._latest is not None:
+                queue.put(dict(self._latest))
+
+    def unsubscribe(self, queue: Queue):
+        with self._lock:
+            self._queues.remove(queue)
+
+    def put(self, item: dict):
+        with self._lock:
+            # messages (success, error, etc.) end what a late subscriber should see
+            self._latest = None if "event" in item else item
+            for queue in self._queues:
+                queue.put(dict(item))  # consumers may pop fields
+
+
 class ProgressReporter:
     """
     An interface for either printing a progress bar to the console,
@@ -49,7 +92,10 @@ class ProgressReporter:
         total (int): Number of units to process, usually the file size in bytes.
         progress (Optional[Progress]): Rich Progress instance for console output.
         task_id (Optional[int]): Task ID for GUI progress updates.
-        upstream (Optional[Queue]): Provides callback to propagate updates to GUI.
+        upstream (Optional[Queue]): Provides callback to propagate updates to GUI,
+            either a queue or a ProgressBroadcast.
+        scheduler (Optional[PrideScheduler]): Scheduler of the batch the task is in,
+            whose stage limits are obeyed (see manifest/scheduler.py).
     """
 
     title: str
@@ -57,6 +103,7 @@ class ProgressReporter:
     progress: Optional[Progress] = None
     task_id: Optional[int] = None
     upstream: Optional[Queue[dict]] = None
+    scheduler = None  # not annotated to avoid circular import
     is_standalone: bool = False
 
     status2color = {
@@ -78,6 +125,7 @@ class ProgressReporter:
         progress: Optional[Progress] = None,
         task_id: Optional[int] = None,
         upstream: Optional[Queue[dict]] = None,
+        scheduler=None,
         **kwargs,  # wildcard, catches any unused parameters for compatibility
     ):
         """
@@ -92,8 +140,11 @@ class ProgressReporter:
                 Again, should only be provided by PrideManifest.download().
             upstream (Queue[dict], optional): Provides callback to propagate updates
                 to GUI. Suppresses console output if set.
+            scheduler (PrideScheduler, optional): Scheduler of the batch.
+                Again, should only be provided by PrideManifest.download().
         """
         self.upstream = upstream
+        self.scheduler = scheduler
         if not progress:
             assert (
                 task_id is None
@@ -114,6 +165,18 @@ class ProgressReporter:
             self.task_id = task_id
             self.is_standalone = False
 
+    def limit(self, stage: str) -> ContextManager:
+        """
+        Returns a slot to hold during a stage, limiting its concurrency
+        across the batch. A no-op outside of scheduled batches.
+
+        Args:
+            stage (str): Either 'network' or 'cpu'.
+        """
+        if self.scheduler is None:
+            return nullcontext()
+        return getattr(self.scheduler, stage)
+
     def _rich_descr(self, stage: str, color: str) -> str:
         return f"[white]{self.title}[/] - [{color}]{stage}[/]"
 
@@ -164,6 +227,7 @@ class ProgressReporter:
             # might be redundant since GUI never runs non-standalone Reporters
             self.progress.update(self.task_id, visible=True)
 
+        self.progress.update(self.task_id, completed=0)  # if prefetched
         self._emit_progress("Starting", total=self.total)
 
     def update(self, stage: str, advance: Optional[int] = None):
@@ -3,31 +3,147 @@ utils.py
 General-purpose utilities: hashing, decorators, etc.
 """
 
+import os
 import re
-from typing import Callable
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator, Optional, Union
 
 from cryptography.hazmat.primitives import hashes
 
 
 def md5sum(data: bytes) -> bytes:
     """Calculates MD5 hash of the given data."""
-    digest = hashes.Hash(hashes.MD5())
+    digest = md5hasher()
     digest.update(data)
     return digest.finalize()
 
 
+def md5hasher() -> hashes.Hash:
+    """Creates an MD5 hash context, for data that arrives in chunks."""
+    return hashes.Hash(hashes.MD5())
+
+
+@contextmanager
+def atomic_open(path: Union[str, Path], mode: str = "w", **kwargs):
+    """
+    Opens a temporary file next to 'path' for writing, and atomically replaces
+    'path' with it on success. The temporary file is removed on failure,
+    so readers never observe a partially written file.
+
+    Args:
+        path (Union[str, Path]): Final destination of the file.
+        mode (str) = 'w': File mode, either 'w' or 'wb'.
+        **kwargs: Passed to open(), e.g. 'encoding' or 'newline'.
+    """
+
+    path = Path(path)
+    # unlike mkstemp(), which is owner-only, leaves the permissions to the umask
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp = path.with_name(f".{path.name}.{os.urandom(4).hex()}.tmp")
+        try:
+            fd = os.open(tmp, flags, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with open(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def iter_file(
+    path: Union[str, Path],
+    start: int = 0,
+    stop: Optional[int] = None,
+    chunk_size: int = 1 << 20,
+) -> Iterator[bytes]:
+    """
+    Yields the bytes of a file in [start, stop) in chunks, e.g. for streaming responses.
+    """
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        while stop is None or offset < stop:
+            size = chunk_size if stop is None else min(chunk_size, stop - offset)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            yield chunk
+            offset += len(chunk)
+
+
+class RefCountedRegistry:
+    """
+    Per-key values, e.g. locks, created by the first user of a key
+    and dropped after its last user, so that keys seen once don't pile up
+    in long-running processes.
+
+    Methods:
+        acquire(key: Hashable) -> Any:
+            Returns the value of the key, creating it if unused, and counts a user.
+        release(key: Hashable) -> None:
+            Uncounts a user of the key, dropping its value after the last one.
+        hold(key: Hashable) -> ContextManager[Any]:
+            Acquires the value of the key for the duration of the context.
+    """
+
+    _factory: Callable[[], Any]
+    _entries: dict[Hashable, list]  # [value, number of users]
+    _lock: threading.Lock
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def acquire(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [self._factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, key: Hashable):
+        with self._lock:
+            entry = self._entries[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._entries[key]
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        value = self.acquire(key)
+        try:
+            yield value
+        finally:
+            self.release(key)
+
+
 def nocache(func) -> Callable:
-    """Decorator to temporarily disable caching for PrideDummyMedia and children."""
+    """
+    Decorator to keep payloads fetched by the decorated function out of the
+    shared media cache (see media/cache.py), e.g. for bulk downloads.
+    Only affects the calling thread and the tasks and download workers it spawns.
+    """
 
-    from .media import PrideDummyMedia
+    from .media.cache import cache
 
     def wrapper(*args, **kwargs):
-        original = PrideDummyMedia.ENABLE_CACHE
-        PrideDummyMedia.ENABLE_CACHE = False
-        try:
+        with cache.bypass():
             return func(*args, **kwargs)
-        finally:
-            PrideDummyMedia.ENABLE_CACHE = original
 
     return wrapper
 
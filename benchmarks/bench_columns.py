@@ -0,0 +1,105 @@
+"""
+bench_columns.py
+Memory and load time of the columnar object lists, against the list of
+info dicts with ID and name indexes they replaced, both loaded from ProtoDB.
+
+Usage: PYTHONPATH=. python benchmarks/bench_columns.py [--assetbundles N] [--resources N]
+"""
+
+import gc
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from google.protobuf.json_format import MessageToDict
+from synth import make_database
+
+from IdolyPrideObjectManager.manifest.octodb_pb2 import Database, pdbytes2columns
+
+
+class LegacyList:
+    """The former PrideObjectList: sorted info dicts, plus ID and name indexes."""
+
+    def __init__(self, infos: list[dict]):
+        infos.sort(key=lambda x: x["id"])
+        self.infos = infos
+        self.id_idx = {info["id"]: i for i, info in enumerate(infos)}
+        self.name_idx = {info["name"]: i for i, info in enumerate(infos)}
+
+    def by_id(self, id: int) -> dict:
+        return self.infos[self.id_idx[id]]
+
+    def by_name(self, name: str) -> dict:
+        return self.infos[self.name_idx[name]]
+
+
+class ColumnList:
+    """Lookups as done by the current PrideObjectList."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        columns.name_order  # built on first lookup by name otherwise
+
+    def by_id(self, id: int) -> dict:
+        return self.columns.info(self.columns.find_id(id))
+
+    def by_name(self, name: str) -> dict:
+        return self.columns.info(self.columns.find_name(name))
+
+
+def load_legacy(pdb: bytes) -> list:
+    jdict = MessageToDict(Database().FromString(pdb))
+    return [LegacyList(jdict[key]) for key in ("assetBundleList", "resourceList")]
+
+
+def load_columns(pdb: bytes) -> list:
+    jdict = pdbytes2columns(pdb)
+    return [ColumnList(jdict[key]) for key in ("assetBundleList", "resourceList")]
+
+
+def measure(load, pdb: bytes, probes: list[list[dict]]) -> dict:
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    lists = load(pdb)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for store, infos in zip(lists, probes):
+        for info in infos:
+            assert store.by_id(info["id"])["name"] == info["name"]
+            assert store.by_name(info["name"])["id"] == info["id"]
+    lookups = time.perf_counter() - start
+
+    return {"load": elapsed, "retained": retained, "peak": peak, "lookups": lookups}
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assetbundles", type=int, default=20000)
+    parser.add_argument("--resources", type=int, default=15000)
+    args = parser.parse_args()
+
+    db = make_database(args.assetbundles, args.resources)
+    pdb = db.SerializeToString()
+    jdict = MessageToDict(db)
+    probes = [jdict[key][::7] for key in ("assetBundleList", "resourceList")]
+
+    print(
+        f"{args.assetbundles + args.resources} entries ({len(pdb) / 2**20:.1f} MiB ProtoDB),"
+        f" {sum(map(len, probes))} looked up by ID and by name"
+    )
+    print("(load times are under tracemalloc, so inflated alike)")
+    for label, load in [("list of dicts", load_legacy), ("columns", load_columns)]:
+        r = measure(load, pdb, probes)
+        print(
+            f"{label:14} load {r['load'] * 1e3:6.0f} ms"
+            f"  retained {r['retained'] / 2**20:5.1f} MiB"
+            f"  peak {r['peak'] / 2**20:5.1f} MiB"
+            f"  lookups {r['lookups'] * 1e3:5.0f} ms"
+        )
@@ -0,0 +1,109 @@
+"""
+bench_convert.py
+Throughput of a conversion-heavy download (PNG images to resized JPEGs)
+with conversions in threads, and in 1 up to N worker processes.
+Raw bytes come from a local server and are stored once, so conversion dominates.
+
+Usage: PYTHONPATH=. python benchmarks/bench_convert.py [--images N] [--processes N]
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+from IdolyPrideObjectManager.manifest import PrideManifest
+from IdolyPrideObjectManager.media.cache import cache, conversions
+from IdolyPrideObjectManager.media.image import PrideImage
+from IdolyPrideObjectManager.object import PrideResource
+
+files = {}
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = files[self.path.strip("/").split("/")[0]]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageResource(PrideResource):
+    """Resources have no image plugin of their own; assetbundles need UnityPy input."""
+
+    @property
+    def _media_class(self) -> type:
+        return PrideImage
+
+
+def make_manifest(url: str, n: int) -> PrideManifest:
+    rng = np.random.default_rng(0)
+    infos = []
+    for i in range(1, n + 1):
+        pixels = rng.integers(0, 255, (768, 768, 3), dtype=np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, "PNG")
+        body = files[f"o{i}"] = buf.getvalue()
+        infos.append(
+            {
+                "id": i,
+                "name": f"img_bench-{i:03}.png",
+                "objectName": f"o{i}",
+                "size": len(body),
+                "md5": hashlib.md5(body).hexdigest(),
+                "generation": 1700000000000000,
+                "uploadVersionId": 1,
+            }
+        )
+    m = PrideManifest({"revision": 1, "urlFormat": url, "resourceList": infos})
+    m.resources.base_class = ImageResource
+    return m
+
+
+if __name__ == "__main__":  # worker processes re-import this module
+
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    m = make_manifest(
+        f"http://127.0.0.1:{server.server_address[1]}/{{o}}/{{g}}", args.images
+    )
+
+    print(f"{args.images} 768x768 PNG -> JPEG conversions on {os.cpu_count()} cores")
+    baseline = None
+    for processes in [0, *range(1, args.processes + 1)]:
+        cache.clear()
+        conversions.clear()  # or every run after the first would be cache hits
+        with tempfile.TemporaryDirectory() as out:
+            start = time.perf_counter()
+            m.download_all(
+                path=out, image_format="jpeg", image_resize="16:9", processes=processes
+            )
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        label = f"{processes} processes" if processes else "threads"
+        print(
+            f"{label:12} {elapsed:6.2f} s  {args.images / elapsed:6.1f} images/s"
+            f"  x{baseline / elapsed:.2f}"
+        )
+
+    server.shutdown()
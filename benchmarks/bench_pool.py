@@ -0,0 +1,102 @@
+"""
+bench_pool.py
+Connection reuse of the shared pool (see network.py) against a bare requests.get()
+per object, with a local keep-alive HTTP server standing in for the CDN.
+
+Usage: PYTHONPATH=. python benchmarks/bench_pool.py [--requests N] [--threads N]
+"""
+
+import hashlib
+import os
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from IdolyPrideObjectManager.network import pool
+from IdolyPrideObjectManager.object import PrideResource
+
+BODY = os.urandom(64 << 10)
+
+
+class CountingServer(ThreadingHTTPServer):
+    """Counts the TCP connections accepted."""
+
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1  # accept loop runs in one thread
+        super().process_request(request, client_address)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(server: CountingServer, job, items: list, threads: int) -> tuple:
+    pool.configure()  # start without idle connections
+    server.connections = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        for _ in executor.map(job, items):
+            pass
+    return time.perf_counter() - start, server.connections
+
+
+def download(obj: PrideResource):
+    for _ in obj._iter_download():  # transfer and verify, bypassing the store
+        pass
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    urls = [f"{base}/{i}" for i in range(args.requests)]
+    objs = [
+        PrideResource(
+            {
+                "id": i,
+                "name": f"txt_{i}.txt",
+                "objectName": f"o{i}",
+                "size": len(BODY),
+                "md5": hashlib.md5(BODY).hexdigest(),
+                "generation": 1,
+                "uploadVersionId": 1,
+            },
+            base + "/{o}/{g}",
+        )
+        for i in range(args.requests)
+    ]
+
+    print(f"{args.requests} requests of {len(BODY) >> 10} KiB, {args.threads} threads")
+    for label, job, items in [
+        ("requests.get", lambda url: requests.get(url, timeout=10).content, urls),
+        ("pool.get", lambda url: pool.get(url, timeout=10).content, urls),
+        ("object downloads", download, objs),
+    ]:
+        elapsed, connections = run(server, job, items, args.threads)
+        print(f"{label:16} {elapsed:6.2f} s  {connections:5} connections")
+
+    server.shutdown()
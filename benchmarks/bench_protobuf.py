@@ -0,0 +1,71 @@
+"""
+bench_protobuf.py
+Decoding and encoding ProtoDB manifests straight from and into columns,
+against the former MessageToDict / ParseDict path, checking both round-trip.
+
+Usage: PYTHONPATH=. python benchmarks/bench_protobuf.py [--assetbundles N] [--resources N]
+"""
+
+import time
+from argparse import ArgumentParser
+
+from synth import make_database
+
+from IdolyPrideObjectManager.manifest import PrideManifest
+from IdolyPrideObjectManager.manifest.octodb_pb2 import (
+    Database,
+    columns2pdbytes,
+    dict2pdbytes,
+    pdbytes2columns,
+    pdbytes2dict,
+)
+
+
+def best_of(repeat: int, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assetbundles", type=int, default=20000)
+    parser.add_argument("--resources", type=int, default=15000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdb = make_database(args.assetbundles, args.resources).SerializeToString()
+    print(f"{args.assetbundles + args.resources} entries, best of {args.repeat}")
+
+    t_dict, jdict = best_of(args.repeat, pdbytes2dict, pdb)
+    t_cols, cols = best_of(args.repeat, pdbytes2columns, pdb)
+    print(
+        f"decode  MessageToDict {t_dict * 1e3:6.0f} ms  columns {t_cols * 1e3:6.0f} ms"
+    )
+
+    # both must describe the same manifest, down to field presence
+    m_dict, m_cols = PrideManifest(jdict), PrideManifest(cols)
+    assert m_dict.canon_repr == m_cols.canon_repr, "decoders disagree"
+
+    t_dict, out_dict = best_of(args.repeat, dict2pdbytes, m_dict.canon_repr)
+    t_cols, out_cols = best_of(
+        args.repeat,
+        columns2pdbytes,
+        m_cols.revision.this,
+        m_cols.urlformat,
+        m_cols.assetbundles.columns,
+        m_cols.resources.columns,
+    )
+    print(
+        f"encode  ParseDict     {t_dict * 1e3:6.0f} ms  columns {t_cols * 1e3:6.0f} ms"
+    )
+
+    # re-encoded bytes parse back into the original database
+    original = Database().FromString(pdb)
+    assert Database().FromString(out_cols) == original, "column encoder is lossy"
+    assert Database().FromString(out_dict) == original, "dict encoder is lossy"
+    print("round trip: lossless")
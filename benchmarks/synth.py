@@ -0,0 +1,71 @@
+"""
+synth.py
+Synthetic ProtoDB manifests for benchmarks, shaped like the real ones.
+"""
+
+import hashlib
+import random
+import string
+
+from IdolyPrideObjectManager.manifest.octodb_pb2 import Database
+
+PREFIXES = [
+    "img_card_full_1",
+    "img_card_full_0",
+    "sud_vo_adv_main",
+    "mov_card_full",
+    "spi_chr",
+    "adv_main",
+    "img_photo_full",
+    "env_bg",
+]
+CHARACTERS = ["mna", "ktn", "ngs", "ski", "suz", "mei", "skr", "szk", "chs", "rei"]
+
+
+def make_database(
+    n_assetbundles: int = 20000,
+    n_resources: int = 15000,
+    revision: int = 500,
+    seed: int = 0,
+) -> Database:
+    """
+    Builds a manifest of unique names, random sizes, MD5s and generations,
+    with dependencies on about 30% of the assetbundles.
+    """
+
+    r = random.Random(seed)
+    db = Database(revision=revision)
+    db.urlFormat = "https://cdn.example/{type}/{o}?generation={g}&alt=media&v={v}"
+    names = set()
+
+    def name(ext: str) -> str:
+        while True:
+            s = f"{r.choice(PREFIXES)}-{r.choice(CHARACTERS)}-{r.randint(0, 99999):05}{ext}"
+            if s not in names:
+                names.add(s)
+                return s
+
+    def common(d, i: int):
+        d.id = i + 1
+        d.size = r.randint(1000, 10**7)
+        d.state = r.choice([1, 2])
+        d.md5 = hashlib.md5(str(r.random()).encode()).hexdigest()
+        d.objectName = "".join(r.choices(string.ascii_lowercase + string.digits, k=6))
+        d.generation = r.randint(1_600_000_000_000_000, 1_750_000_000_000_000)
+        d.uploadVersionId = r.randint(1, 600)
+
+    for i in range(n_assetbundles):
+        d = db.assetBundleList.add()
+        common(d, i)
+        d.name = name("")
+        d.crc = r.getrandbits(32)
+        d.priority = r.choice([0, 0, 1, 5])
+        if r.random() < 0.3:
+            d.dependencies.extend(r.sample(range(1, n_assetbundles), r.randint(1, 4)))
+
+    for i in range(n_resources):
+        d = db.resourceList.add()
+        common(d, i)
+        d.name = name(r.choice([".acb", ".mp4", ".txt", ".awb"]))
+
+    return db
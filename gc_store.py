@@ -0,0 +1,76 @@
+"""
+gc_store.py
+Script to prune the local object store (see IdolyPrideObjectManager/object/store.py)
+of objects no retained manifest still references.
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+import IdolyPrideObjectManager as ipom
+from IdolyPrideObjectManager.manifest import snapshots
+from IdolyPrideObjectManager.object.store import store
+
+
+def referenced_md5s(manifest: ipom.PrideManifest) -> set[str]:
+    """Collects the MD5 of every object in the manifest."""
+    return set(manifest.assetbundles.columns.columns["md5"]) | set(
+        manifest.resources.columns.columns["md5"]
+    )
+
+
+def do_gc(sources: list[str], use_snapshots: bool = True, dry_run: bool = False):
+    """
+    Removes objects from the store that none of the retained manifests reference.
+
+    Args:
+        sources (list[str]): Manifest files to retain, see ipom.load().
+            Directories are expanded to the '*.json' exports they contain.
+        use_snapshots (bool) = True: Whether to also retain every manifest
+            in the local snapshot cache.
+        dry_run (bool) = False: Whether to only report what would be removed.
+    """
+
+    retained = set()
+    count = 0
+
+    for source in sources:
+        source = Path(source)
+        for path in sorted(source.glob("*.json")) if source.is_dir() else [source]:
+            # reading sources must not add snapshots for the pass below to count
+            retained |= referenced_md5s(ipom.load(path, cache=False))
+            count += 1
+
+    if use_snapshots:
+        for manifest in snapshots.manifests():
+            retained |= referenced_md5s(manifest)
+            count += 1
+
+    if count == 0:
+        print("No manifest retained, refusing to empty the store.")
+        return
+
+    n, size = store.gc(retained, dry_run=dry_run)
+    verb = "Would remove" if dry_run else "Removed"
+    print(
+        f"{verb} {n} files ({size / 2**20:.1f} MiB) unreferenced by {count} manifests."
+    )
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Prune unreferenced objects from the store")
+    parser.add_argument(
+        "sources", nargs="*", help="Manifest files or directories to retain"
+    )
+    parser.add_argument(
+        "--no-snapshots",
+        action="store_true",
+        help="Don't retain manifests in the snapshot cache",
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="Only report what would be removed"
+    )
+    args = parser.parse_args()
+
+    do_gc(args.sources, use_snapshots=not args.no_snapshots, dry_run=args.dry_run)
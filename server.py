@@ -4,29 +4,33 @@ Flask web server entry point.
 """
 
 import json
-from collections import defaultdict
+import os
 from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
 from queue import Queue
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 from flask import Flask, Response, jsonify, render_template, request
+from werkzeug.http import http_date
+from werkzeug.wsgi import ClosingIterator
 
-import IdolyPrideObjectManager as ipom
+from IdolyPrideObjectManager.const import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE
 from IdolyPrideObjectManager.manifest import PrideManifest
+from IdolyPrideObjectManager.manifest.refresher import PrideManifestRefresher
 from IdolyPrideObjectManager.object import PrideAssetBundle, PrideResource
+from IdolyPrideObjectManager.rich import ProgressBroadcast
+from IdolyPrideObjectManager.utils import RefCountedRegistry
 
 # bookkeeping & helpers
 
 app = Flask(__name__)
-queues = defaultdict(Queue)
-m = None
+# one per object in use, fanned out to SSE clients
+broadcasts = RefCountedRegistry(ProgressBroadcast)
+refresher = PrideManifestRefresher()  # warm start from snapshot cache, then diffs
 
 
 def _get_manifest() -> PrideManifest:
-    global m
-    if m is None:
-        m = ipom.fetch()
-    return m
+    return refresher.current()
 
 
 def _get_object(
@@ -53,29 +57,121 @@ def _sanitize_mtime(mtime: float) -> str:
     return mtime.strftime("%Y-%m-%d %H:%M:%S")
 
 
+def _etag(*parts) -> str:
+    # strong validator of everything the response body depends on
+    return blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _validators(etag: str, mtime: Optional[float] = None) -> dict:
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}  # always revalidate
+    if mtime is not None:
+        headers["Last-Modified"] = http_date(mtime)
+    return headers
+
+
+def _not_modified(etag: str, mtime: Optional[float] = None) -> Optional[Response]:
+    """
+    Returns a 304 response if the request's validators match, before any work is done.
+    If-Modified-Since is only considered without If-None-Match, per RFC 9110.
+    """
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)  # weak comparison for GET
+    else:
+        since = request.if_modified_since
+        fresh = (
+            since is not None and mtime is not None and int(mtime) <= since.timestamp()
+        )
+
+    if fresh:
+        return Response(status=304, headers=_validators(etag, mtime))
+    return None
+
+
+def _reported(
+    obj: Union[PrideAssetBundle, PrideResource], chunks: Iterator[bytes]
+) -> Iterator[bytes]:
+    # streams download lazily, so they're only done once the body has been sent
+    yield from chunks
+    obj._reporter.success("Data ready at frontend")
+
+
+def _ranged_response(
+    obj: Union[PrideAssetBundle, PrideResource],
+    upstream: ProgressBroadcast,
+    etag: str,
+    mtime: float,
+) -> Response:
+
+    stream = obj.get_stream(upstream=upstream)
+    size = stream["size"]
+    headers = {"Accept-Ranges": "bytes", **_validators(etag, mtime)}
+
+    # a single byte range, e.g. for seeking in <video>; multiple ranges get it all,
+    # and so does a range conditional on another version (If-Range)
+    start, stop, status = 0, size, 200
+    span = request.range
+    if_range = request.if_range
+    if if_range.etag is not None:
+        current = if_range.etag == etag
+    else:
+        current = if_range.date is None or int(mtime) <= if_range.date.timestamp()
+    if current and span is not None and span.units == "bytes" and len(span.ranges) == 1:
+        span = span.range_for_length(size)
+        if span is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        (start, stop), status = span, 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+
+    headers["Content-Length"] = str(stop - start)
+    return Response(
+        _reported(obj, stream["chunks"](start, stop)),
+        status=status,
+        mimetype=stream["mimetype"],
+        headers=headers,
+        direct_passthrough=True,  # chunks are already bytes
+    )
+
+
 # API endpoints
 
 
 @app.route("/api/manifest")
 def api_manifest() -> Response:
-    return jsonify(_get_manifest().canon_repr)
+    m = _get_manifest()
+    etag = _etag("manifest", str(m.revision))
+    response = _not_modified(etag)
+    if response is None:
+        response = jsonify(m.canon_repr)
+        response.headers.update(_validators(etag))
+    return response
 
 
 @app.route("/api/search")
 def api_search() -> Response:
     query = request.args.get("query", "")
+    page_size = request.args.get("entriesPerPage", SEARCH_PAGE_SIZE, type=int)
+    objs, total = _get_manifest().search_page(
+        "".join(f"(?=.*{word})" for word in query.split()),
+        # use lookahead to match all words in any order
+        by_name=request.args.get("byID", "true") != "true",
+        ascending=request.args.get("ascending", "false") == "true",
+        page=max(request.args.get("currentPage", 1, type=int), 1),
+        page_size=min(max(page_size, 1), SEARCH_MAX_PAGE_SIZE),
+    )
     return jsonify(
-        [
-            {
-                "id": obj.id,
-                "name": obj.name,
-                "type": type(obj).__name__[5:],  # valid names start with "Pride"
-            }
-            for obj in _get_manifest().search(
-                "".join(f"(?=.*{word})" for word in query.split())
-                # use lookahead to match all words in any order
-            )
-        ]
+        {
+            "total": total,
+            "entries": [
+                {
+                    "id": obj.id,
+                    "name": obj.name,
+                    "type": type(obj).__name__[5:],  # valid names start with "Pride"
+                }
+                for obj in objs
+            ],
+        }
     )
 
 
@@ -87,42 +183,64 @@ def api_bytestream(type: str, id: str) -> Response:
     except (ValueError, KeyError):
         return jsonify({"error": "Object not found"})
 
-    q = queues[(type, id)]
-    data = obj.get_data(upstream=q)
-    obj._reporter.success("Data ready at frontend")
-
-    return Response(
-        data["bytes"],
-        mimetype=data["mimetype"],
-        headers={"Last-Modified": _sanitize_mtime(data["mtime"])},
+    # the body only depends on the bytes (and the name, for deobfuscation)
+    # and on how they're converted, which is decided by the media class
+    mtime = int(obj.generation) / 1e6
+    etag = _etag(type, obj.md5, obj.name, obj._media_class.__name__)
+    response = _not_modified(etag, mtime)
+    if response is not None:
+        return response
+
+    # concurrent requests of the object share one download and conversion
+    key = (type, id)
+    upstream = broadcasts.acquire(key)
+    try:
+        response = _ranged_response(obj, upstream, etag, mtime)
+    except BaseException:
+        broadcasts.release(key)
+        raise
+    # closed by the server whether or not the body was sent in full;
+    # not Response.call_on_close(), which direct passthrough skips
+    response.response = ClosingIterator(
+        response.response, lambda: broadcasts.release(key)
     )
+    return response
 
 
 @app.route("/api/caption_map/<name>")
 def api_caption_map(name: str) -> Response:
     try:
-        ret = _get_object(
-            "resource", name.replace("sud_vo_", "") + ".txt"
-        ).media.caption_map
+        obj = _get_object("resource", name.replace("sud_vo_", "") + ".txt")
+    except KeyError:
+        return jsonify({"error": "Caption not found"})
+
+    etag = _etag("caption_map", obj.md5, obj.name)
+    response = _not_modified(etag, int(obj.generation) / 1e6)
+    if response is not None:
+        return response
+
+    try:
+        ret = obj.media.caption_map
     except KeyError:
         ret = {"error": "Caption not found"}
     except AttributeError:
         ret = {"error": "Caption not supported"}
     except ValueError:
         ret = {"error": "Caption loading failed"}
-    return jsonify(ret)
+
+    response = jsonify(ret)
+    if "error" not in ret:  # errors may be transient, don't let them be cached
+        response.headers.update(_validators(etag, int(obj.generation) / 1e6))
+    return response
 
 
 # SSE endpoints
 
 
-def _poll_and_format(type: str, id: str) -> str:
+def _poll_and_format(q: Queue) -> str:
 
     event: str = ""
     data: dict = {}
-    q: Optional[Queue[dict]] = None
-
-    q = queues[(type, id)]
 
     try:
         progress: dict = q.get(timeout=1)
@@ -143,9 +261,16 @@ def _poll_and_format(type: str, id: str) -> str:
 @app.route("/sse/<type>/<id>/progress")
 def sse_progress(type: str, id: str) -> Response:
 
+    q = Queue()
+
     def generate():
-        while True:
-            yield _poll_and_format(type, id)
+        with broadcasts.hold((type, id)) as broadcast:
+            broadcast.subscribe(q)
+            try:
+                while True:
+                    yield _poll_and_format(q)
+            finally:  # client disconnected
+                broadcast.unsubscribe(q)
 
     return Response(
         generate(),
@@ -197,13 +322,10 @@ def view(type: str, id: str) -> str:
     info["mtime"] = _sanitize_mtime(int(obj.generation))
 
     if "dependencies" in info:
+        m = _get_manifest()
         info["dependencies"] = [
-            {
-                "id": dep,
-                "name": _get_object(type, dep).name,  # error handling?
-            }
-            for dep in info["dependencies"]
-        ]
+            {"id": dep.id, "name": dep.name} for dep in m.dependencies(obj.id)
+        ]  # resolved by the dependency graph, missing ones are skipped
 
     return render_template("view.html", info=info, type=type_display)
 
@@ -214,4 +336,6 @@ def page_not_found(error: Exception) -> tuple[str, int]:
 
 
 if __name__ == "__main__":
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # not the reloader parent
+        refresher.current()  # load before the first request
     app.run(debug=True, port=5001)
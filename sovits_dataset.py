@@ -15,13 +15,14 @@ from zipfile import ZipFile, ZipInfo
 from tqdm import tqdm
 
 import IdolyPrideObjectManager as ipom
+from IdolyPrideObjectManager.const import SNAPSHOT_MAX_AGE
 from IdolyPrideObjectManager.object import PrideResource
 from IdolyPrideObjectManager.rich import Logger
 from IdolyPrideObjectManager.utils import make_caption_map
 
 logger = Logger()
 logger.info("Fetching manifest...")
-m = ipom.fetch()
+m = ipom.fetch(max_age=SNAPSHOT_MAX_AGE)
 
 
 class CacheHandler:
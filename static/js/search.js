@@ -1,15 +1,15 @@
 // We keep these vars global to avoid passing them around
-let searchEntries = []; // this can be huge (up to ~10k entries)
+let searchEntries = []; // entries of the current page only
+let totalEntries = 0; // across all pages
 let sortState = {
     byID: null,
     ascending: null,
 };
-/*  Even though backend returns entries by ascending name,
-    it's more extensible to avoid hardcoding this assumption,
-    since we now force a sort at initial display.
-    (Sorting by large amounts is made possible by pagination,
-    which removes the overhead of *displaying* them all at once.)
+/*  Sorting and pagination are done by the backend,
+    which returns only the requested page and the total count,
+    so broad queries (up to ~10k entries) cost as much as narrow ones.
 */
+let pageRequest = null; // in-flight page request, superseded by the next one
 
 // highlighting support
 let tokens = [];
@@ -22,23 +22,24 @@ var totalPages = 0;
 
 /*  CONTROL FLOW:
     $(document).ready
+        -> fetchSearchPage
         -> populateSearchpageContainers
-        -> sortSearchEntries, updateEpp
     updateSort
-        -> sortSearchEntries, updatePageState
-    updateEpp
         -> updatePageState
+    updateEpp
+        -> updatePageState (refetching unless initial)
     updatePageState
+        -> fetchSearchPage
         -> refreshCardContainer
         -> updatePagination, highlightTokens
     updatePagination
         -> appendPaginationButton
 
-                   US - SSE
-                      X
-    [init] - PSC ----/  UPS - RCC - UP - APB
-                 \    /           \
-                   UE               HT
+                   US
+                      \
+    [init] - FSP - PSC   UPS - FSP - RCC - UP - APB
+                      /              \
+                   UE                  HT
 */
 
 function appendPaginationButton(text, isEnabled, pageUpdater) {
@@ -55,7 +56,7 @@ function appendPaginationButton(text, isEnabled, pageUpdater) {
 }
 
 function updatePagination() {
-    totalPages = Math.ceil(searchEntries.length / entriesPerPage);
+    totalPages = Math.ceil(totalEntries / entriesPerPage);
     $("#paginationContainer").empty();
 
     // Prev  [1]    2                      ...    N   Next
@@ -126,11 +127,7 @@ function refreshCardContainer() {
     $("html, body").animate({ scrollTop: 0 }, "fast");
     $("#searchEntryCardContainer").empty();
 
-    let start = (currentPage - 1) * entriesPerPage;
-    let end = Math.min(currentPage * entriesPerPage, searchEntries.length);
-    let pageEntries = searchEntries.slice(start, end);
-
-    pageEntries.forEach((entry) => {
+    searchEntries.forEach((entry) => {
         let card = $("<div>")
             .addClass("card shadow-at-hover")
             .attr("id", "searchEntryCard");
@@ -186,7 +183,7 @@ function refreshCardContainer() {
     updatePagination();
 }
 
-function updatePageState() {
+function updatePageState(refetch = true) {
     const params = new URLSearchParams(window.location.search);
     params.set("query", $("#searchInput").val().trim());
     params.set("byID", sortState.byID);
@@ -198,25 +195,41 @@ function updatePageState() {
         "",
         `${window.location.pathname}?${params}`
     );
-    refreshCardContainer();
-}
-
-function sortSearchEntries() {
-    if (sortState.byID) {
-        searchEntries.sort((a, b) => {
-            // alphabetical order in entry.type implies AssetBundle < Resource
-            if (a.type < b.type) return -1;
-            if (a.type > b.type) return 1;
-            return a.id - b.id;
-        });
+    if (refetch) {
+        fetchSearchPage(refreshCardContainer);
     } else {
-        searchEntries.sort((a, b) => {
-            return a.name.localeCompare(b.name);
-        });
+        refreshCardContainer();
     }
-    if (!sortState.ascending) {
-        searchEntries.reverse();
+}
+
+function fetchSearchPage(onSuccess) {
+    if (pageRequest) {
+        pageRequest.abort(); // its page is no longer wanted
     }
+    pageRequest = $.ajax({
+        type: "GET",
+        url: `/api/search`,
+        data: {
+            query: query,
+            byID: sortState.byID,
+            ascending: sortState.ascending,
+            entriesPerPage: entriesPerPage,
+            currentPage: currentPage,
+        },
+        dataType: "json",
+        contentType: "application/json; charset=utf-8",
+        success: function (result) {
+            pageRequest = null;
+            searchEntries = result.entries;
+            totalEntries = result.total;
+            onSuccess();
+        },
+        error: function (request, ...args) {
+            if (request.statusText !== "abort") {
+                dumpErrorToConsole(request, ...args);
+            }
+        },
+    });
 }
 
 function updateSort() {
@@ -228,13 +241,12 @@ function updateSort() {
 
     sortState.byID = byID_new;
     sortState.ascending = ascending_new;
-    sortSearchEntries();
 
     currentPage = 1;
     updatePageState();
 }
 
-function updateEpp(resetPage = true) {
+function updateEpp(resetPage = true, refetch = true) {
     $("#eppValue").text(entriesPerPage);
 
     if (entriesPerPage <= 12) {
@@ -251,23 +263,22 @@ function updateEpp(resetPage = true) {
     // If new EPP is non-devisible by old EPP,
     // we're unclear about which page we are currently on.
     if (resetPage) currentPage = 1;
-    updatePageState();
+    updatePageState(refetch);
 }
 
 function populateSearchpageContainers(queryDisplay) {
     $("#searchResultTitle").text(`Search results for "${queryDisplay}"`);
 
-    if (searchEntries.length === 0) {
+    if (totalEntries === 0) {
         $("#searchResultDigest").text("No results found.");
         $("#searchEntryCardContainer").hide();
         $("#paginationContainer").hide();
     } else {
         $("#searchResultDigest").text(
-            `Found ${searchEntries.length}` +
-                (searchEntries.length === 1 ? " entry." : " entries.")
+            `Found ${totalEntries}` +
+                (totalEntries === 1 ? " entry." : " entries.")
         );
-        sortSearchEntries();
-        updateEpp((resetPage = false));
+        updateEpp(false, false); // the page was fetched along with the total
     }
 
     $("#loadingSpinner").hide();
@@ -282,20 +293,7 @@ $(document).ready(function () {
 
     tokens = queryDisplay.split(/\s+/);
 
-    $.ajax({
-        type: "GET",
-        url: `/api/search`,
-        data: { query: query },
-        dataType: "json",
-        contentType: "application/json; charset=utf-8",
-        success: function (result) {
-            searchEntries = result;
-            populateSearchpageContainers(queryDisplay); // an extra arg, fine
-        },
-        error: function (...args) {
-            dumpErrorToConsole(...args);
-        },
-    });
+    fetchSearchPage(() => populateSearchpageContainers(queryDisplay));
 
     // the following highlights are onetime inits,
     // as info will be passed backwards from here on
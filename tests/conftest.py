@@ -0,0 +1,99 @@
+"""
+conftest.py
+Shared fixtures: an isolated cache directory, and a local object server.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# must precede the first package import, since const.py reads it
+os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="ipom-tests-")
+
+import IdolyPrideObjectManager as ipom  # noqa: E402
+
+RANGE = re.compile(r"bytes=(\d+)-")
+
+
+class ObjectServer(ThreadingHTTPServer):
+    """
+    Serves 'files' at /<objectName>/<generation>, honoring open-ended Range
+    requests unless 'ranges' is False, and recording the Range header of
+    every request in 'requests'.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.files = {}
+        self.ranges = True
+        self.requests = []
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/{{o}}/{{g}}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.server.files[self.path.strip("/").split("/")[0]]
+        header = self.headers.get("Range")
+        self.server.requests.append(header)
+
+        match = RANGE.fullmatch(header or "")
+        if self.server.ranges and match and int(match[1]) < len(body):
+            start = int(match[1])
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ObjectServer()
+    threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def make_info(id: int, name: str, body: bytes, **fields) -> dict:
+    return {
+        "id": id,
+        "name": name,
+        "objectName": f"o{id}",
+        "size": len(body),
+        "md5": hashlib.md5(body).hexdigest(),
+        "generation": 1700000000000000,
+        "uploadVersionId": 1,
+        **fields,
+    }
+
+
+def make_manifest(
+    url: str, assetbundles=(), resources=(), revision: int = 1
+) -> "ipom.PrideManifest":
+    return ipom.PrideManifest(
+        {
+            "revision": revision,
+            "urlFormat": url,
+            "assetBundleList": list(assetbundles),
+            "resourceList": list(resources),
+        }
+    )
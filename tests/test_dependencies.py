@@ -0,0 +1,59 @@
+"""
+test_dependencies.py
+Dependency graph and download planning over assetbundle dependencies.
+"""
+
+import itertools
+
+import pytest
+from conftest import make_info, make_manifest
+
+
+def _manifest(deps: dict):
+    return make_manifest(
+        "http://127.0.0.1/{o}/{g}",
+        assetbundles=[
+            make_info(
+                i, f"bin_ab-{i:02}", b"x" * i, **({"dependencies": d} if d else {})
+            )
+            for i, d in sorted(deps.items())
+        ],
+    )
+
+
+def test_closure_and_order():
+    m = _manifest({1: [], 2: [1], 3: [1], 10: [2], 11: [2, 3], 99: []})
+    assert [o.id for o in m.dependencies(11, recursive=True)] == [1, 2, 3]
+    assert [o.id for o in m.dependents(1, recursive=True)] == [2, 3, 10, 11]
+
+    graph, ids = m.dependency_graph, m.assetbundles.columns.ids.tolist()
+    rows = graph.closure([ids.index(10), ids.index(11)]).tolist()
+    order = [ids[row] for row in graph.order(rows)]
+    assert order.index(1) < order.index(2) < order.index(10)
+    assert order.index(3) < order.index(11)
+
+
+@pytest.mark.parametrize("s, a, b", list(itertools.permutations([1, 2, 3])))
+def test_with_dependencies_reaching_a_cycle(s, a, b):
+    # s -> b, and a <-> b: whichever IDs they get, the cut of the cycle
+    # must not be visited before the selection reaches it
+    m = _manifest({s: [b], a: [b], b: [a]})
+    kw = {"path": "somewhere"}
+    jobs = m._with_dependencies([(m.assetbundles[s], kw)])
+
+    assert sorted(obj.id for obj, _ in jobs) == [1, 2, 3]
+    assert all(k is kw for _, k in jobs)
+    assert jobs[-1][0].id == s  # after its dependencies
+
+
+def test_with_dependencies_keeps_resources_last():
+    m = make_manifest(
+        "http://127.0.0.1/{o}/{g}",
+        assetbundles=[
+            make_info(1, "bin_a", b"a", dependencies=[2]),
+            make_info(2, "bin_b", b"b"),
+        ],
+        resources=[make_info(5, "txt_c.txt", b"c")],
+    )
+    jobs = m._with_dependencies([(m.resources[5], {}), (m.assetbundles[1], {})])
+    assert [obj.id for obj, _ in jobs] == [2, 1, 5]
@@ -0,0 +1,69 @@
+"""
+test_diff.py
+Differentiating object lists and manifests by per-entry fingerprints.
+"""
+
+import pytest
+from conftest import make_info, make_manifest
+
+URL = "http://127.0.0.1/{o}/{g}"
+
+
+def _infos(prefix: str, changed: dict) -> dict[int, dict]:
+    # 1 unchanged, 2 changed, 3 added (new only), 4 removed (old only)
+    return {
+        i: make_info(i, f"{prefix}_diff{i}", b"x" * i, **changed.get(i, {}))
+        for i in (1, 2, 3, 4)
+    }
+
+
+@pytest.fixture
+def manifests():
+    old = {kind: _infos(kind, {}) for kind in ("ab", "txt")}
+    new = {
+        "ab": _infos("ab", {2: {"dependencies": [1]}}),
+        "txt": _infos("txt", {2: {"md5": "0" * 32}}),
+    }
+    for kind in ("ab", "txt"):
+        del old[kind][3], new[kind][4]
+
+    def make(infos: dict, revision: int):
+        return make_manifest(URL, infos["ab"].values(), infos["txt"].values(), revision)
+
+    return make(new, 2), make(old, 1)
+
+
+def _ids(objects) -> list[int]:
+    return [obj.id for obj in objects]
+
+
+@pytest.mark.parametrize("kind", ["assetbundles", "resources"])
+def test_list_sub_and_diff(manifests, kind):
+    new, old = (getattr(m, kind) for m in manifests)
+    assert _ids(new - old) == [2, 3]
+
+    added, changed, removed = new.diff(old)
+    assert (_ids(added), _ids(changed), _ids(removed)) == ([3], [2], [4])
+    assert removed[4].canon_repr == old[4].canon_repr  # taken from the older list
+
+    # same as comparing every entry by name, suffixed or not
+    by_name = {obj.name: obj.canon_repr for obj in old}
+    assert _ids(new - old) == [
+        obj.id for obj in new if by_name.get(obj.name) != obj.canon_repr
+    ]
+
+
+@pytest.mark.parametrize("kind", ["assetbundles", "resources"])
+def test_list_sub_unchanged(manifests, kind):
+    new, _ = (getattr(m, kind) for m in manifests)
+    assert len(new - new) == 0
+    assert [len(part) for part in new.diff(new)] == [0, 0, 0]
+
+
+def test_manifest_diff(manifests):
+    new, old = manifests
+    updated, removed = new.diff(old)
+    assert _ids(updated.assetbundles) == _ids((new - old).assetbundles) == [2, 3]
+    assert _ids(updated.resources) == _ids((new - old).resources) == [2, 3]
+    assert _ids(removed.assetbundles) == _ids(removed.resources) == [4]
+    assert updated.revision == removed.revision == new.revision - old.revision
@@ -0,0 +1,54 @@
+"""
+test_flight.py
+Coalescing of concurrent object data requests.
+"""
+
+import threading
+import time
+
+from IdolyPrideObjectManager.object.flight import PrideSingleFlight
+
+
+def test_coalesces_and_forgets_subjects():
+    flights = PrideSingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "data"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("s", "p", fn)))
+        for _ in range(3)
+    ]
+    threads[0].start()
+    started.wait()
+    for t in threads[1:]:
+        t.start()
+    while flights.coalesced < 2:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["data"] * 3 and len(calls) == 1
+    assert not flights._inflight and not len(flights._locks)  # nothing left behind
+
+
+def test_forgets_subjects_on_error():
+    flights = PrideSingleFlight()
+
+    def fn():
+        raise ValueError("conversion failed")
+
+    for subject in range(10):
+        try:
+            flights.do(subject, "p", fn)
+        except ValueError:
+            pass
+
+    assert not flights._inflight and not len(flights._locks)
@@ -0,0 +1,102 @@
+"""
+test_resume.py
+Resumable downloads through '.part' files and their journals.
+"""
+
+import json
+import os
+
+import pytest
+from conftest import make_info
+
+from IdolyPrideObjectManager.object import PrideResource, resource
+from IdolyPrideObjectManager.object.store import store
+
+SIZE = 256 << 10
+
+
+@pytest.fixture(autouse=True)
+def small_checkpoints(monkeypatch):
+    monkeypatch.setattr(resource, "RESUME_CHECKPOINT", 32 << 10)
+
+
+def _resource(server, body: bytes, **fields) -> PrideResource:
+    server.files["o1"] = body
+    obj = PrideResource(make_info(1, "txt_resume.txt", body, **fields), server.url)
+    obj._reporter.register()  # failed sanity checks only raise once registered
+    return obj
+
+
+def _paths(obj: PrideResource):
+    blob = store.path(obj.md5)
+    part = blob.with_name(blob.name + ".part")
+    return blob, part, part.with_name(part.name + ".json")
+
+
+def _interrupt(obj: PrideResource, after: int) -> int:
+    """Downloads into the '.part' until 'after' bytes, then drops the connection."""
+    _, part, _ = _paths(obj)
+    part.parent.mkdir(parents=True, exist_ok=True)
+    chunks = obj._iter_part(part)
+    for offset, chunk in chunks:
+        if offset + len(chunk) >= after:
+            break
+    chunks.close()
+    return offset + len(chunk)
+
+
+def test_interrupted_part_resumes(server):
+    obj = _resource(server, os.urandom(SIZE))
+    _interrupt(obj, SIZE // 2)
+    blob, part, journal = _paths(obj)
+    offset = json.loads(journal.read_text())["offset"]
+    assert 0 < offset <= part.stat().st_size
+
+    server.requests.clear()
+    assert obj._fetch_blob() == blob
+    assert server.requests == [f"bytes={offset}-"]
+    assert blob.read_bytes() == server.files["o1"]
+    assert not part.exists() and not journal.exists()
+
+
+@pytest.mark.parametrize("corrupt", ["prefix", "journal"])
+def test_corrupted_part_restarts(server, corrupt):
+    obj = _resource(server, os.urandom(SIZE))
+    _interrupt(obj, SIZE // 2)
+    blob, part, journal = _paths(obj)
+    if corrupt == "prefix":
+        with open(part, "r+b") as f:
+            f.write(b"garbage")
+    else:
+        journal.write_text("{not json")
+
+    server.requests.clear()
+    obj._fetch_blob()
+    assert server.requests == [None]  # no Range, from the start
+    assert blob.read_bytes() == server.files["o1"]
+    assert not part.exists() and not journal.exists()
+
+
+def test_server_ignoring_range(server):
+    obj = _resource(server, os.urandom(SIZE))
+    _interrupt(obj, SIZE // 2)
+    blob, _, journal = _paths(obj)
+    offset = json.loads(journal.read_text())["offset"]
+
+    server.ranges = False  # replies 200 with the whole body
+    server.requests.clear()
+    obj._fetch_blob()
+    assert server.requests == [f"bytes={offset}-"]
+    assert blob.read_bytes() == server.files["o1"]  # the prefix was skipped
+
+
+@pytest.mark.parametrize("field", ["md5", "size"])
+def test_final_mismatch_deletes_part(server, field):
+    body = os.urandom(SIZE)
+    wrong = {"md5": os.urandom(16).hex()} if field == "md5" else {"size": SIZE + 1}
+    obj = _resource(server, body, **wrong)
+    blob, part, journal = _paths(obj)
+
+    with pytest.raises(RuntimeError):
+        obj._fetch_blob()
+    assert not blob.exists() and not part.exists() and not journal.exists()
@@ -0,0 +1,35 @@
+"""
+test_search.py
+Paged search over the manifest, sorted by name or ID.
+"""
+
+import pytest
+from conftest import make_info, make_manifest
+
+NAMES = ["txt_b.txt", "txt_C.txt", "txt_a.txt", "txt_B2.txt", "txt_A1.txt"]
+
+
+@pytest.fixture
+def manifest():
+    return make_manifest(
+        "http://127.0.0.1/{o}/{g}",
+        resources=[make_info(i, name, b"x") for i, name in enumerate(NAMES, 1)],
+    )
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_page_by_name_ignores_case(manifest, ascending):
+    expected = sorted(NAMES, key=str.casefold, reverse=not ascending)
+    pages = [
+        manifest.search_page(
+            "txt_", by_name=True, ascending=ascending, page=page, page_size=2
+        )
+        for page in (1, 2, 3, 4)
+    ]
+    assert [total for _, total in pages] == [len(NAMES)] * 4
+    assert [obj.name for objs, _ in pages for obj in objs] == expected
+
+
+def test_page_by_id(manifest):
+    objs, total = manifest.search_page("txt_[ab]", by_name=False, ascending=False)
+    assert total == 4 and [obj.id for obj in objs] == [5, 4, 3, 1]
@@ -0,0 +1,63 @@
+"""
+test_store.py
+Fetching into the object store, and materializing outputs from it.
+"""
+
+import os
+import threading
+
+import pytest
+from conftest import make_info
+
+from IdolyPrideObjectManager.object import PrideResource
+from IdolyPrideObjectManager.object.store import PrideObjectStore, store
+
+MD5 = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    ret = PrideObjectStore(tmp_path / "store", link_modes=("hardlink", "copy"))
+    blob = ret.path(MD5)
+    blob.parent.mkdir(parents=True)
+    blob.write_bytes(b"blob")
+    os.utime(blob, (1000, 1000))
+    return ret
+
+
+def test_hardlink_when_mtime_matches(blob_store, tmp_path):
+    dest = tmp_path / "out.txt"
+    blob_store.materialize(MD5, dest, mtime=1000)
+    assert os.path.samefile(dest, blob_store.path(MD5))
+
+
+@pytest.mark.parametrize("head", [b"", b"B"])
+def test_mtime_never_touches_blob(blob_store, tmp_path, head):
+    dest = tmp_path / "out.txt"
+    blob_store.materialize(MD5, dest, head=head, mtime=2000)
+    assert not os.path.samefile(dest, blob_store.path(MD5))
+    assert dest.stat().st_mtime == 2000
+    assert dest.read_bytes() == head + b"blob"[len(head) :]
+    assert blob_store.path(MD5).stat().st_mtime == 1000
+    assert blob_store.path(MD5).read_bytes() == b"blob"
+
+
+def test_locks_dropped_after_fetches(server):
+    objs = []
+    for i in range(4):
+        server.files[f"o{i}"] = body = os.urandom(64 << 10)
+        objs.append(PrideResource(make_info(i, f"txt_lock{i}.txt", body), server.url))
+        objs[-1]._reporter.register()
+
+    # streamed and blocking fetches of the same objects, racing for their locks
+    jobs = [obj._fetch_blob for obj in objs]
+    jobs += [lambda obj=obj: b"".join(obj._iter_raw()) for obj in objs * 2]
+    threads = [threading.Thread(target=job) for job in jobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for obj in objs:
+        assert store.path(obj.md5).read_bytes() == server.files[f"o{obj.id}"]
+    assert not len(store._locks)  # nothing left behind
@@ -4,35 +4,102 @@ Script to fetch latest manifest and diff from server,
 compatible with 'Update Manifest' workflow.
 """
 
+import re
 import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional, Union
 
 import IdolyPrideObjectManager as ipom
+from IdolyPrideObjectManager.utils import atomic_open
 
+# exports always start with the revision, see PrideManifest.canon_repr
+REVISION_PATTERN = re.compile(r'\{\s*"revision":\s*(?:\[\s*(\d+),\s*(\d+)\s*\]|(\d+))')
 
-def do_update(path: str) -> bool:
-    """Check for manifest update from server and optionally update all diff revisions."""
+
+def stored_revision(path: Path) -> Optional[Union[int, tuple[int, int]]]:
+    """
+    Reads the revision of an exported JSON manifest without parsing the whole file.
+    Returns None if the file is missing or visibly truncated.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64).decode("utf-8", errors="ignore")
+            f.seek(-2, 2)  # a complete export ends with '}' (no trailing newline)
+            tail = f.read()
+    except OSError:
+        return None
+
+    match = REVISION_PATTERN.match(head)
+    if not match or not tail.rstrip().endswith(b"}"):
+        return None
+    if match[3]:
+        return int(match[3])
+    return (int(match[1]), int(match[2]))
+
+
+def do_update(path: str, full: bool = False, workers: int = 8) -> bool:
+    """
+    Check for manifest update from server and update all diff revisions.
+    In incremental mode (default), only revisions that are missing
+    or not diffed against the latest on disk are fetched.
+
+    Args:
+        path (str): Directory of 'LATEST_REVISION' and 'vNNNN.json' exports.
+        full (bool) = False: Whether to refetch every revision regardless of disk state.
+        workers (int) = 8: Maximum number of concurrent fetches.
+    """
 
     path = Path(path)
     m_remote = ipom.fetch()
     rev_remote = m_remote.revision.canon_repr
     rev_local = int((path / "LATEST_REVISION").read_text())
 
-    if rev_remote == rev_local:
+    expected = {i: (rev_remote, i) for i in range(1, rev_remote)}
+    expected[0] = rev_remote
+    stale = [
+        i
+        for i, revision in sorted(expected.items())
+        if full or stored_revision(path / f"v{i:04}.json") != revision
+    ]
+
+    if rev_remote == rev_local and not stale:
         print("No update available.")
         return False
 
     # Only write to file after sanity check;
     # this number is used to construct commit message in workflow.
-    (path / "LATEST_REVISION").write_text(str(rev_remote))
+    with atomic_open(path / "LATEST_REVISION", "w") as f:
+        f.write(str(rev_remote))
+
+    print(f"Fetching {len(stale)} of {len(expected)} revisions.")
+
+    def update(i: int):
+        # diffs go stale on every update, don't fill the snapshot cache with them
+        m = m_remote if i == 0 else ipom.fetch(i, cache=False)
+        if m.revision.canon_repr != expected[i]:  # server moved on mid-update
+            print(f"Revision v{i:04} fetched as {m.revision}, will retry next update.")
+        m.export(path / f"v{i:04}.json", force_overwrite=True)
 
-    m_remote.export(path / "v0000.json", force_overwrite=True)
-    for i in range(1, rev_remote):
-        ipom.fetch(i).export(path / f"v{i:04}.json", force_overwrite=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(update, stale):
+            pass  # re-raise the first exception, if any
 
     return True
 
 
 if __name__ == "__main__":
-    HAS_UPDATE = do_update("manifests")
+
+    parser = ArgumentParser(description="Update manifests from server")
+    parser.add_argument(
+        "-f", "--full", action="store_true", help="Refetch all revisions"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=8, help="Number of concurrent fetches"
+    )
+    args = parser.parse_args()
+
+    HAS_UPDATE = do_update("manifests", full=args.full, workers=args.workers)
     sys.exit(not (HAS_UPDATE))